@@ -0,0 +1,253 @@
+"""Benchmarks for plugcli at scale.
+
+This synthesizes N file plugins and N namespace-package plugins in a
+temporary directory, and times:
+
+* ``CLI()`` construction (eager, and lazy from a discovery cache)
+* rendering the command listing for ``--help`` (``CLI.format_commands``),
+  both from scratch and from the CLI's cache of the rendered listing
+* ``CLI.get_command`` dispatch
+* ``MultiStrategyGetter`` resolution with N strategies
+
+Results are written as JSON, so that runs from different releases can be
+compared. With plugcli installed (e.g., ``pip install -e .``), run::
+
+    python benchmarks/bench_plugcli.py --sizes 10 100 --output new.json
+    python benchmarks/bench_plugcli.py --compare old.json new.json
+"""
+import argparse
+import datetime
+import importlib
+import importlib.metadata
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import click
+
+from plugcli.cli import CLI
+from plugcli.discovery_cache import DiscoveryCache
+from plugcli.params import MultiStrategyGetter, NOT_PARSED
+from plugcli.plugin_management import (
+    CommandPlugin, FilePluginLoader, NamespacePluginLoader
+)
+
+SECTIONS = ["Simulation", "Analysis", "Miscellaneous"]
+NAMESPACE = "plugcli_bench_plugins"
+
+PLUGIN_TEMPLATE = '''\
+import click
+from plugcli.plugin_management import CommandPlugin
+
+@click.command("{name}", short_help="{name} help")
+@click.option("--value", type=int, default=0)
+def {func}(value):
+    click.echo(value)
+
+PLUGIN = CommandPlugin(
+    command={func},
+    section="{section}",
+    requires_lib=(1, 0, 0),
+    requires_cli=(1, 0, 0),
+)
+'''
+
+
+def write_plugins(directory, n_plugins, prefix):
+    """Write ``n_plugins`` plugin files to ``directory``"""
+    os.makedirs(directory, exist_ok=True)
+    for i in range(n_plugins):
+        func = f"{prefix}_{i:05d}"
+        content = PLUGIN_TEMPLATE.format(name=func.replace('_', '-'),
+                                         func=func,
+                                         section=SECTIONS[i % len(SECTIONS)])
+        with open(os.path.join(directory, func + ".py"), 'w') as f:
+            f.write(content)
+
+
+def purge_namespace():
+    """Remove the benchmark namespace from ``sys.modules``"""
+    for name in list(sys.modules):
+        if name == NAMESPACE or name.startswith(NAMESPACE + "."):
+            del sys.modules[name]
+    importlib.invalidate_caches()
+
+
+def make_cli_class(get_plugins):
+    class BenchCLI(CLI):
+        COMMAND_SECTIONS = SECTIONS
+
+        def get_installed_plugins(self):
+            return get_plugins()
+
+    return BenchCLI
+
+
+def timeit(func, repeats, setup=None):
+    """Time ``func``; return list of times in seconds"""
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(benchmark, n_plugins, times):
+    return {
+        'benchmark': benchmark,
+        'n': n_plugins,
+        'repeats': len(times),
+        'min': min(times),
+        'mean': statistics.mean(times),
+        'median': statistics.median(times),
+    }
+
+
+def bench_size(n_plugins, repeats, workdir):
+    """Run all benchmarks for a given number of plugins"""
+    file_dir = os.path.join(workdir, f"file_{n_plugins}")
+    ns_root = os.path.join(workdir, f"ns_{n_plugins}")
+    write_plugins(file_dir, n_plugins, "file")
+    # no __init__.py: implicit namespace package
+    write_plugins(os.path.join(ns_root, NAMESPACE), n_plugins, "ns")
+    sys.path.insert(0, ns_root)
+    cache = DiscoveryCache(os.path.join(workdir, f"cache_{n_plugins}"))
+
+    def file_loader():
+        return FilePluginLoader(file_dir, CommandPlugin)
+
+    def ns_loader():
+        return NamespacePluginLoader(NAMESPACE, CommandPlugin)
+
+    cli_classes = {
+        'file': make_cli_class(lambda: file_loader()()),
+        'namespace': make_cli_class(lambda: ns_loader()()),
+        'file-lazy': make_cli_class(
+            lambda: cache.lazy_plugins(file_loader())
+        ),
+        'namespace-lazy': make_cli_class(
+            lambda: cache.lazy_plugins(ns_loader())
+        ),
+    }
+
+    results = []
+    try:
+        # warm the discovery cache
+        cache.index(file_loader())
+        cache.index(ns_loader())
+        for label, cli_class in cli_classes.items():
+            times = timeit(cli_class, repeats, setup=purge_namespace)
+            results.append(summarize(f"construct[{label}]", n_plugins,
+                                     times))
+
+            cli = cli_class()
+            ctx = click.Context(cli)
+
+            def render_help():
+                cli.format_commands(ctx, click.HelpFormatter())
+
+            # the rendered listing is cached by the CLI, so time rendering
+            # it (cleared cache) separately from reusing it
+            times = timeit(render_help, repeats,
+                           setup=cli._rendered_commands.clear)
+            results.append(summarize(f"help[{label}]", n_plugins, times))
+            render_help()
+            times = timeit(render_help, repeats)
+            results.append(summarize(f"help-cached[{label}]", n_plugins,
+                                     times))
+
+            names = cli.list_commands(ctx)
+
+            def dispatch():
+                for name in names:
+                    cli.get_command(ctx, name)
+
+            times = timeit(dispatch, repeats)
+            results.append(summarize(f"get_command[{label}]", n_plugins,
+                                     [t / len(names) for t in times]))
+    finally:
+        sys.path.remove(ns_root)
+        purge_namespace()
+
+    fail = lambda user_input, context: NOT_PARSED
+    succeed = lambda user_input, context: user_input
+    getter = MultiStrategyGetter([fail] * (n_plugins - 1) + [succeed],
+                                 error_message="{user_input}")
+    times = timeit(lambda: getter("foo"), repeats)
+    results.append(summarize("multi_strategy_getter", n_plugins, times))
+    return results
+
+
+def metadata():
+    try:
+        from plugcli.version import version
+    except Exception:  # version info shouldn't stop benchmarks
+        version = "Unknown"
+
+    return {
+        'plugcli_version': version,
+        'click_version': importlib.metadata.version("click"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': datetime.datetime.now().isoformat(),
+    }
+
+
+def run(sizes, repeats):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_plugins in sizes:
+            results.extend(bench_size(n_plugins, repeats, workdir))
+    return {'metadata': metadata(), 'results': results}
+
+
+def compare(old_file, new_file):
+    """Print ratio of new to old median times"""
+    with open(old_file) as f:
+        old = {(r['benchmark'], r['n']): r for r in json.load(f)['results']}
+    with open(new_file) as f:
+        new = {(r['benchmark'], r['n']): r for r in json.load(f)['results']}
+
+    print(f"{'benchmark':<32} {'n':>6} {'old (ms)':>10} {'new (ms)':>10}"
+          f" {'ratio':>7}")
+    for key in sorted(set(old) & set(new)):
+        old_t = old[key]['median']
+        new_t = new[key]['median']
+        ratio = new_t / old_t if old_t else float('nan')
+        print(f"{key[0]:<32} {key[1]:>6d} {old_t * 1000:>10.3f}"
+              f" {new_t * 1000:>10.3f} {ratio:>7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 100, 1000],
+                        help="numbers of plugins to benchmark")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', default=None,
+                        help="JSON file for results (default: stdout)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help="compare two results files instead of running")
+    opts = parser.parse_args(argv)
+
+    if opts.compare:
+        compare(*opts.compare)
+        return
+
+    report = json.dumps(run(opts.sizes, opts.repeats), indent=2)
+    if opts.output is None:
+        print(report)
+    else:
+        with open(opts.output, 'w') as f:
+            f.write(report)
+
+
+if __name__ == "__main__":
+    main()
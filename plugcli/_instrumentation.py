@@ -0,0 +1,80 @@
+"""Shared machinery for instruments enabled by an environment variable.
+
+Used by :mod:`plugcli.profiling` and :mod:`plugcli.tracing`.
+"""
+import atexit
+import contextlib
+import os
+
+
+class EnvActivatedInstrument:
+    """Process-wide instrument, optionally enabled by an environment
+    variable.
+
+    The instrument is created by :meth:`.enable`, or on the first call to
+    :meth:`.get` if the environment variable is set; in that case, the
+    variable's value is the destination for the instrument's report.
+
+    Parameters
+    ----------
+    env_var : str
+        name of the environment variable
+    factory : Callable[..., Any]
+        creates the instrument; the instrument must have an
+        ``emit(destination)`` method, and may have a ``stop()`` method that
+        is called when it is disabled
+    """
+    def __init__(self, env_var, factory):
+        self.env_var = env_var
+        self.factory = factory
+        self.active = None
+        self.env_checked = False
+
+    def enable(self, destination=None, **kwargs):
+        """Create and activate a new instrument.
+
+        Parameters
+        ----------
+        destination : str or None
+            if given, the instrument's report is written here when the
+            process exits
+        kwargs :
+            passed to the factory
+
+        Returns
+        -------
+        Any :
+            the active instrument
+        """
+        self.active = self.factory(**kwargs)
+        if destination is not None:
+            atexit.register(self.active.emit, destination)
+        return self.active
+
+    def disable(self):
+        """Deactivate (and stop) the active instrument, if any"""
+        stop = getattr(self.active, 'stop', None)
+        if stop is not None:
+            stop()
+        self.active = None
+
+    def get(self):
+        """The active instrument, or None if it is not enabled.
+
+        The first call checks the environment variable.
+        """
+        if not self.env_checked:
+            self.env_checked = True
+            destination = os.environ.get(self.env_var)
+            if destination:
+                self.enable(destination)
+        return self.active
+
+    def context(self, method, *args, **kwargs):
+        """Context manager from a method of the active instrument, or a
+        null context if it is not enabled.
+        """
+        instrument = self.get()
+        if instrument is None:
+            return contextlib.nullcontext()
+        return getattr(instrument, method)(*args, **kwargs)
@@ -0,0 +1,54 @@
+"""Built-in ``batch`` command: run many subcommands in one process.
+
+To add it to a CLI, include the plugin from :func:`.batch_plugin` in the
+plugins returned by ``get_installed_plugins``.
+"""
+import sys
+
+import click
+
+from .plugin_management import CommandPlugin
+
+
+@click.command(
+    "batch",
+    short_help="Run many commands (one per line) in a single process",
+)
+@click.argument("script", type=click.File('r'), default='-')
+@click.option("--continue-on-error", is_flag=True,
+              help="Keep going after a command fails.")
+def batch(script, continue_on_error):
+    """Run commands listed in SCRIPT (default: stdin), one per line.
+
+    Each line is a command line for this program, without the program name.
+    Blank lines and lines starting with # are ignored. The exit code is 0
+    if all commands succeed; otherwise it is the exit code of the first
+    failing command.
+    """
+    ctx = click.get_current_context()
+    cli = ctx.find_root().command
+    results = cli.run_batch(script, continue_on_error=continue_on_error,
+                            prog_name=ctx.find_root().info_name)
+
+    failures = [(lineno, line, code) for lineno, line, code in results
+                if code != 0]
+    for lineno, line, code in failures:
+        click.echo(f"Line {lineno} failed with exit code {code}: {line}",
+                   err=True)
+
+    if failures:
+        click.echo(f"{len(failures)} of {len(results)} commands failed",
+                   err=True)
+        sys.exit(failures[0][2])
+
+
+def batch_plugin(section):
+    """Plugin for the ``batch`` command.
+
+    Parameters
+    ----------
+    section : str
+        help section to list the command in
+    """
+    return CommandPlugin(command=batch, section=section,
+                         requires_lib=None, requires_cli=None)
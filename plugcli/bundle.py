@@ -0,0 +1,119 @@
+"""Plugin bundles: pack a directory of file plugins into a single file.
+
+A bundle is read by :class:`.BundlePluginLoader` in one sequential read,
+which is much faster than loading many small plugin files on a network file
+system. Build a bundle with :func:`.build_bundle`, or with the
+``bundle-plugins`` command; to add that command to a CLI, include the plugin
+from :func:`.bundle_plugin` in the plugins returned by
+``get_installed_plugins``.
+"""
+import importlib.util
+import json
+import marshal
+import os
+import tempfile
+import zipfile
+
+import click
+
+from .plugin_management import (
+    BUNDLE_FORMAT, BUNDLE_TOC, CommandPlugin, FilePluginLoader,
+    bundle_bytecode_name,
+)
+
+
+def build_bundle(plugin_dir, output, plugin_class=CommandPlugin):
+    """Create a plugin bundle from a directory of file plugins.
+
+    Each plugin file is executed to create the table of contents (unless
+    its plugins can be found statically), and is compiled to bytecode for
+    the running Python version.
+
+    Parameters
+    ----------
+    plugin_dir : str
+        directory containing the plugin files, as for
+        :class:`.FilePluginLoader`
+    output : str
+        path of the bundle file to create
+    plugin_class : type
+        plugins are identified as instances of this class; index entries
+        are only stored for command plugins
+
+    Returns
+    -------
+    int :
+        number of plugin files in the bundle
+    """
+    loader = FilePluginLoader(plugin_dir, plugin_class, static=True)
+    is_command = issubclass(plugin_class, CommandPlugin)
+    bundle_path = os.path.abspath(output)
+
+    candidates = {}
+    members = {}
+    for path in loader._find_candidates():
+        member = os.path.basename(path)
+        with open(path, 'rb') as f:
+            source = f.read()
+        # compiled with the filename the loader uses for this candidate
+        filename = os.path.join(bundle_path, member)
+        code = compile(source, filename, 'exec', dont_inherit=True)
+        entries = None
+        if is_command:
+            entries = [dict(entry, location=member)
+                       for entry in loader._index_candidate(path)]
+        candidates[member] = {'entries': entries}
+        members[member] = source
+        members[bundle_bytecode_name(member)] = marshal.dumps(code)
+
+    toc = {
+        'format': BUNDLE_FORMAT,
+        'magic': importlib.util.MAGIC_NUMBER.hex(),
+        'candidates': candidates,
+    }
+
+    # write to temporary file and move, so that running programs never see
+    # a partially-written bundle
+    directory = os.path.dirname(bundle_path)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with zipfile.ZipFile(f, 'w', zipfile.ZIP_STORED) as archive:
+                archive.writestr(BUNDLE_TOC, json.dumps(toc))
+                for name, data in members.items():
+                    archive.writestr(name, data)
+        os.replace(tmp, bundle_path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+    return len(candidates)
+
+
+@click.command(
+    "bundle-plugins",
+    short_help="Pack a directory of plugin files into a single bundle",
+)
+@click.argument("plugin_dir",
+                type=click.Path(exists=True, file_okay=False))
+@click.argument("output", type=click.Path(dir_okay=False))
+def bundle_plugins(plugin_dir, output):
+    """Pack the plugin files in PLUGIN_DIR into the bundle OUTPUT.
+
+    The bundle contains bytecode for the running Python version; with other
+    versions, plugins are compiled from source when they are loaded.
+    """
+    n_plugins = build_bundle(plugin_dir, output)
+    click.echo(f"Bundled {n_plugins} plugin files into {output}")
+
+
+def bundle_plugin(section):
+    """Plugin for the ``bundle-plugins`` command.
+
+    Parameters
+    ----------
+    section : str
+        help section to list the command in
+    """
+    return CommandPlugin(command=bundle_plugins, section=section,
+                         requires_lib=None, requires_cli=None)
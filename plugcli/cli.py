@@ -3,13 +3,17 @@
 This contains the "main" class/functions for running the OPS CLI.
 """
 # builds off the example of Group in click's docs
-import collections
 import os
 import pathlib
+import shlex
+import sys
+import traceback
+import warnings
 
 import click
-# import click_completion
-# click_completion.init()
+
+from .registry import PluginRegistry
+from .tracing import trace_span
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
@@ -20,20 +24,124 @@ class CLI(click.Group):
     Most of the logic here is about handling the plugin infrastructure.
     """
     def __init__(self, *args, **kwargs):
-        # the logic here is all about loading the plugins
-        self._get_command = {}
-        self._sections = collections.defaultdict(list)
-        self.plugins = []
+        with trace_span("CLI.__init__", "cli"):
+            # the logic here is all about loading the plugins
+            self.registry = PluginRegistry()
+            self._rendered_commands = {}
 
-        plugins = self.get_installed_plugins()
-        for plugin in plugins:
-            self._register_plugin(plugin)
+            with trace_span("get_installed_plugins", "cli"):
+                plugins = self.get_installed_plugins()
+            for plugin in plugins:
+                self._register_plugin(plugin)
 
-        super().__init__(*args, **kwargs)
+            super().__init__(*args, **kwargs)
 
     def get_installed_plugins(self):
         raise NotImplementedError()
 
+    def run_args(self, args, prog_name=None):
+        """Run a command line with this CLI, returning the exit code.
+
+        Unlike :meth:`click.Command.main`, this never exits the process.
+
+        Parameters
+        ----------
+        args : List[str]
+            command line arguments (not including the program name)
+        prog_name : str
+            program name to use in usage messages
+
+        Returns
+        -------
+        int :
+            exit code of the command
+        """
+        try:
+            self.main(args=list(args), prog_name=prog_name,
+                      standalone_mode=True)
+        except SystemExit as exc:
+            code = exc.code
+        except Exception:
+            traceback.print_exc()
+            code = 1
+        else:  # -no-cov- (standalone_mode always raises SystemExit)
+            code = 0
+
+        if code is None:
+            code = 0
+        elif not isinstance(code, int):
+            sys.stderr.write(f"{code}\n")
+            code = 1
+        return code
+
+    def run_batch(self, lines, continue_on_error=False, prog_name=None):
+        """Run several command lines in this process.
+
+        Each line is split with shell syntax (``shlex``) and run as a
+        command of this CLI. Blank lines and lines starting with ``#`` are
+        skipped. Since all commands run in the same process, loaded plugins
+        and any getter caches are reused between lines.
+
+        Parameters
+        ----------
+        lines : Iterable[str]
+            command lines (without the program name)
+        continue_on_error : bool
+            if False (default), stop after the first command that fails
+        prog_name : str
+            program name to use in usage messages
+
+        Returns
+        -------
+        List[Tuple[int, str, int]] :
+            line number, line, and exit code for each command run
+        """
+        results = []
+        for lineno, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            try:
+                args = shlex.split(line)
+            except ValueError as exc:
+                sys.stderr.write(f"Error parsing line {lineno}: {exc}\n")
+                code = 2
+            else:
+                code = self.run_args(args, prog_name=prog_name)
+
+            results.append((lineno, line, code))
+            if code != 0 and not continue_on_error:
+                break
+
+        return results
+
+    def serve(self, socket_path, workers=None, **kwargs):
+        """Run this CLI in server mode.
+
+        Commands are sent to the server with the thin client in
+        :mod:`plugcli.client`.
+
+        Parameters
+        ----------
+        socket_path : str
+            path for the server's Unix domain socket
+        workers : int or None
+            if given, commands are run concurrently by this many pre-forked
+            worker processes (see :class:`.ZygoteServer`); otherwise they
+            are run one at a time in the server process (see
+            :class:`.CLIServer`)
+        kwargs :
+            additional keyword arguments for the server class
+        """
+        from .server import CLIServer, ZygoteServer
+        if workers is None:
+            server = CLIServer(self, socket_path, **kwargs)
+        else:
+            server = ZygoteServer(self, socket_path, workers=workers,
+                                  **kwargs)
+        server.serve_forever()
+
     @property
     def _command_sections(self):
         try:
@@ -45,28 +153,69 @@ class CLI(click.Group):
     def _section_label(self, section_name):
         return section_name + " Commands"
 
+    @property
+    def plugins(self):
+        return list(self.registry)
+
     def _register_plugin(self, plugin):
-        self.plugins.append(plugin)
-        # normalize underscores to hyphens
-        name = plugin.name.replace('_', '-')
-        self._get_command[name] = plugin.command
-        self._sections[plugin.section].append(name)
+        # the registry stores the plugin, not the command: lazy plugins
+        # only import their command when get_command asks for it
+        with trace_span("register", "cli", command=plugin.name):
+            replaced = self.registry.register(plugin)
+        if replaced is not None and replaced is not plugin:
+            warnings.warn(f"Command '{plugin.name}' from {plugin.location} "
+                          f"replaces the command from {replaced.location}")
+        self._rendered_commands.clear()
 
     def _deregister_plugin(self, plugin):
         # mainly used in testing
-        self.plugins.remove(plugin)
-        del self._get_command[plugin.name]
-        self._sections[plugin.section].remove(plugin.name)
+        self.registry.deregister(plugin)
+        self._rendered_commands.clear()
 
     def plugin_for_command(self, command_name):
-        return {p.name: p for p in self.plugins}[command_name]
+        return self.registry[command_name]
 
     def list_commands(self, ctx):
-        return list(self._get_command.keys())
+        return self.registry.names()
+
+    def main(self, *args, **kwargs):
+        with trace_span("CLI.main", "cli"):
+            return super().main(*args, **kwargs)
+
+    def parse_args(self, ctx, args):
+        with trace_span("parse_args", "click"):
+            return super().parse_args(ctx, args)
+
+    def invoke(self, ctx):
+        # includes parsing the subcommand's arguments
+        with trace_span("invoke", "click"):
+            return super().invoke(ctx)
 
     def get_command(self, ctx, name):
-        name = name.replace('_', '-')  # allow - or _ from user
-        return self._get_command.get(name)
+        with trace_span("get_command", "cli", command=name):
+            plugin = self.registry.get(name)  # allow - or _ from user
+            if plugin is None:
+                return None
+            return plugin.command
+
+    def shell_complete(self, ctx, incomplete):
+        """Complete subcommand names (and options of this group).
+
+        Unlike :meth:`click.Group.shell_complete`, this uses the metadata
+        stored in the registered plugins, so completing a command name never
+        imports a lazily-loaded plugin. Completing the options of a
+        subcommand only loads that subcommand's plugin.
+        """
+        from click.shell_completion import CompletionItem
+
+        results = [
+            CompletionItem(name, help=plugin.short_help)
+            for name, plugin in zip(self.registry.names(), self.registry)
+            if name.startswith(incomplete)
+        ]
+        # skip click.Group's implementation, which loads every command
+        results.extend(click.Command.shell_complete(self, ctx, incomplete))
+        return results
 
     def _section_sort_commands(self, section, commands):
         """
@@ -77,18 +226,41 @@ class CLI(click.Group):
         """
         yield from commands
 
-    def format_commands(self, ctx, formatter):
+    def _format_command_sections(self, ctx, formatter):
         for sec in self._command_sections:
-            cmds = self._sections.get(sec, [])
+            cmds = self.registry.section_names(sec)
             rows = []
             for cmd in self._section_sort_commands(sec, cmds):
-                command = self.get_command(ctx, cmd)
-                if command is None:
-                    # TODO: there is test code that claims to cover this,
-                    # but it isn't getting covered; investigate why
+                # use the plugin's metadata, so that listing the commands
+                # doesn't import lazily-loaded plugins
+                plugin = self.registry.get(cmd)
+                if plugin is None:
                     continue
-                rows.append((cmd, command.short_help or ''))
+                rows.append((cmd, plugin.short_help or ''))
 
             if rows:
                 with formatter.section(self._section_label(sec)):
                     formatter.write_dl(rows)
+
+    def format_commands(self, ctx, formatter):
+        if not isinstance(formatter, click.HelpFormatter):
+            self._format_command_sections(ctx, formatter)
+            return
+
+        # the rendered listing only depends on the registered plugins and
+        # the formatter's layout, so we cache it for each layout
+        key = (formatter.width, formatter.current_indent)
+        try:
+            rendered = self._rendered_commands[key]
+        except KeyError:
+            sub_formatter = click.HelpFormatter(width=formatter.width)
+            sub_formatter.current_indent = formatter.current_indent
+            self._format_command_sections(ctx, sub_formatter)
+            rendered = sub_formatter.getvalue()
+            self._rendered_commands[key] = rendered
+
+        if rendered:
+            # the sub-formatter started empty, so its first section has no
+            # paragraph break before it; add it in the real formatter
+            formatter.write_paragraph()
+            formatter.write(rendered)
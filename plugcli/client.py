@@ -0,0 +1,154 @@
+"""Thin client for a CLI running in server mode.
+
+This module is kept minimal (no click, no plugins) so that starting it is
+fast. It forwards the command line, working directory, environment, and
+standard streams to a :class:`plugcli.server.CLIServer`, and exits with the
+exit code of the command run by the server.
+
+An application can provide its own entry point using this, e.g.::
+
+    from plugcli.client import main
+    main(socket_path, fallback=run_cli_directly)
+
+POSIX only (requires Unix domain sockets and file descriptor passing).
+"""
+import json
+import os
+import socket
+import struct
+import sys
+
+_HEADER = struct.Struct("!I")
+_STDIO_FDS = [0, 1, 2]
+
+
+class ServerUnavailable(ConnectionError):
+    pass
+
+
+def _recv_exactly(sock, n_bytes):
+    data = b""
+    while len(data) < n_bytes:
+        chunk = sock.recv(n_bytes - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed before message ended")
+        data += chunk
+    return data
+
+
+def send_message(sock, message, fds=None):
+    """Send a JSON-serializable message (and file descriptors)"""
+    payload = json.dumps(message).encode('utf-8')
+    data = _HEADER.pack(len(payload)) + payload
+    if fds:
+        socket.send_fds(sock, [data[:1]], fds)
+        data = data[1:]
+    sock.sendall(data)
+
+
+def recv_message(sock, max_fds=0):
+    """Receive a message sent by :func:`.send_message`.
+
+    Returns
+    -------
+    Tuple[Any, List[int]] :
+        the message and the received file descriptors
+    """
+    fds = []
+    if max_fds:
+        first, fds, _, _ = socket.recv_fds(sock, 1, max_fds)
+        if not first:
+            raise ConnectionError("Connection closed before message")
+        rest = _recv_exactly(sock, _HEADER.size - 1)
+        header = first + rest
+    else:
+        header = _recv_exactly(sock, _HEADER.size)
+
+    (length,) = _HEADER.unpack(header)
+    message = json.loads(_recv_exactly(sock, length).decode('utf-8'))
+    return message, list(fds)
+
+
+def default_socket_path():
+    """Socket path from the ``PLUGCLI_SOCKET`` environment variable"""
+    return os.environ.get("PLUGCLI_SOCKET")
+
+
+def run_client(socket_path, argv=None, fds=None):
+    """Run a command on the server.
+
+    Parameters
+    ----------
+    socket_path : str
+        path to the server's Unix domain socket
+    argv : List[str]
+        command line, including program name; default ``sys.argv``
+    fds : List[int]
+        file descriptors to use as the command's stdin, stdout, and stderr;
+        default is this process's standard streams
+
+    Returns
+    -------
+    int :
+        exit code of the command
+    """
+    if argv is None:
+        argv = sys.argv
+    if fds is None:
+        fds = _STDIO_FDS
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+        except OSError as exc:
+            raise ServerUnavailable(str(exc)) from exc
+
+        request = {
+            'argv': list(argv),
+            'cwd': os.getcwd(),
+            'env': dict(os.environ),
+        }
+        send_message(sock, request, fds=fds)
+        response, _ = recv_message(sock)
+    finally:
+        sock.close()
+
+    error = response.get('error')
+    if error is not None:
+        # report on the command's stderr, as the command would have
+        os.write(fds[2], f"Error from CLI server: {error}\n".encode('utf-8'))
+
+    return response['exit_code']
+
+
+def main(socket_path=None, fallback=None):
+    """Entry point for the thin client; exits with the command's exit code.
+
+    Parameters
+    ----------
+    socket_path : str
+        path to the server's socket; default from the ``PLUGCLI_SOCKET``
+        environment variable
+    fallback : Callable[[], Any]
+        called (instead of raising an error) if the server is not available,
+        e.g., to run the CLI in this process
+    """
+    if socket_path is None:
+        socket_path = default_socket_path()
+
+    try:
+        if socket_path is None:
+            raise ServerUnavailable("No socket path given")
+        exit_code = run_client(socket_path)
+    except ServerUnavailable as exc:
+        if fallback is None:
+            sys.stderr.write(f"Unable to connect to CLI server: {exc}\n")
+            sys.exit(1)
+        return fallback()
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
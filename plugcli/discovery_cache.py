@@ -0,0 +1,198 @@
+"""Persistent cache for plugin discovery.
+
+Discovering plugins requires loading every candidate module. The
+:class:`.DiscoveryCache` stores the results of discovery on disk, so that
+later runs only need to reload the candidates that changed.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+# bump this when the format of the cache files changes
+_CACHE_FORMAT = 1
+
+
+def user_cache_dir():
+    """Directory for plugcli's cache files.
+
+    This can be set with the ``PLUGCLI_CACHE_DIR`` environment variable;
+    otherwise it follows the platform's conventions for user cache
+    directories.
+    """
+    env_dir = os.environ.get("PLUGCLI_CACHE_DIR")
+    if env_dir:
+        return env_dir
+
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser(os.path.join("~", "Library", "Caches"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME",
+                              os.path.expanduser(os.path.join("~", ".cache")))
+    return os.path.join(base, "plugcli")
+
+
+class DiscoveryCache:
+    """On-disk cache of the plugins found by plugin loaders.
+
+    For each loader (identified by plugin type, search path, and plugin
+    class) this records which candidate modules contain which plugins,
+    along with a fingerprint of each candidate (file modification time and
+    size). When the cache is used, only candidates with a changed
+    fingerprint are loaded again; the others are returned as
+    :class:`.LazyCommandPlugin` s built from the cached metadata.
+
+    Parameters
+    ----------
+    directory : str
+        directory to store the cache files in; default given by
+        :func:`.user_cache_dir`
+    """
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = user_cache_dir()
+        self.directory = directory
+
+    @staticmethod
+    def _loader_identity(loader):
+        search_path = loader.search_path
+        if loader.plugin_type == "file":
+            search_path = os.pathsep.join(os.path.abspath(path)
+                                          for path in loader.search_paths)
+        elif loader.plugin_type == "bundle":
+            search_path = os.path.abspath(search_path)
+        plugin_class = loader.plugin_class
+        return ":".join([
+            loader.plugin_type,
+            str(search_path),
+            plugin_class.__module__ + "." + plugin_class.__qualname__,
+        ])
+
+    def _cache_file(self, loader):
+        identity = self._loader_identity(loader)
+        digest = hashlib.sha256(identity.encode('utf-8')).hexdigest()
+        filename = f"discovery-{digest[:16]}.json"
+        return os.path.join(self.directory, filename)
+
+    def load(self, loader):
+        """Load the cached candidate records for a loader.
+
+        Parameters
+        ----------
+        loader : :class:`.CLIPluginLoader`
+
+        Returns
+        -------
+        Dict[str, Dict[str, Any]] :
+            mapping of candidate key to a dict with keys ``fingerprint`` and
+            ``entries`` (the candidate's index entries); empty if there is
+            no valid cache
+        """
+        try:
+            with open(self._cache_file(loader), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        valid = (
+            isinstance(data, dict)
+            and data.get('format') == _CACHE_FORMAT
+            and data.get('loader') == self._loader_identity(loader)
+        )
+        if not valid:
+            return {}
+
+        return data.get('candidates', {})
+
+    def save(self, loader, candidates):
+        """Write the candidate records for a loader to disk.
+
+        Failure to write the cache (e.g., read-only file system) is not an
+        error; the cache just won't be used.
+
+        Parameters
+        ----------
+        loader : :class:`.CLIPluginLoader`
+        candidates : Dict[str, Dict[str, Any]]
+            candidate records, in the format returned by :meth:`.load`
+        """
+        data = {
+            'format': _CACHE_FORMAT,
+            'loader': self._loader_identity(loader),
+            'candidates': candidates,
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # write to temporary file and move, so concurrent processes
+            # never see a partially-written cache
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp, self._cache_file(loader))
+            except BaseException:
+                os.remove(tmp)
+                raise
+        except OSError:
+            pass
+
+    def clear(self, loader):
+        """Remove the cache for a given loader"""
+        try:
+            os.remove(self._cache_file(loader))
+        except FileNotFoundError:
+            pass
+
+    def index(self, loader):
+        """Index for the loader, reloading only changed candidates.
+
+        Parameters
+        ----------
+        loader : :class:`.CLIPluginLoader`
+
+        Returns
+        -------
+        List[Dict[str, Any]] :
+            index entries, as in :meth:`.CLIPluginLoader.index`
+        """
+        cached = self.load(loader)
+        fingerprints = loader._candidate_fingerprints()
+        candidates = {}
+        changed = []
+        for key, fingerprint in fingerprints.items():
+            record = cached.get(key)
+            # a fingerprint of None means we can't tell if it changed
+            if (record is None or fingerprint is None
+                    or record['fingerprint'] != fingerprint):
+                changed.append(key)
+            candidates[key] = record
+
+        # reload changed candidates (concurrently, if the loader allows)
+        for key, entries in zip(changed,
+                                loader._map(loader._index_candidate,
+                                            changed)):
+            candidates[key] = {'fingerprint': fingerprints[key],
+                               'entries': entries}
+
+        if candidates != cached:
+            self.save(loader, candidates)
+
+        return [entry for record in candidates.values()
+                for entry in record['entries']]
+
+    def lazy_plugins(self, loader):
+        """Lazy plugins for the loader, using cached discovery results.
+
+        Parameters
+        ----------
+        loader : :class:`.CLIPluginLoader`
+
+        Returns
+        -------
+        List[:class:`.LazyCommandPlugin`] :
+            plugins that only load their command when it is needed
+        """
+        return loader.lazy_plugins(self.index(loader))
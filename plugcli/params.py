@@ -1,11 +1,219 @@
+import asyncio
+import collections
+import graphlib
+import inspect
+import operator
+import os
+
 import click
 
+from .tracing import trace_span
+
 
 def _decorator_not_implemented(*args, **kwargs):
     raise NotImplementedError("'decorator' is not implemented for this "
                               "class")
 
 
+def _is_async(func):
+    """Whether calling ``func`` returns a coroutine"""
+    return (inspect.iscoroutinefunction(func)
+            or inspect.iscoroutinefunction(getattr(func, '__call__', None)))
+
+
+def _run_sync(awaitable):
+    async def wait():
+        return await awaitable
+    return asyncio.run(wait())
+
+
+async def _gather_results(results):
+    """Await the awaitables in a list of results (concurrently)"""
+    async def wait(result):
+        if inspect.isawaitable(result):
+            return await result
+        return result
+    return await asyncio.gather(*(wait(result) for result in results))
+
+
+class LazyResult:
+    """Transparent proxy for an object that is created on first use.
+
+    The object is created (by calling ``factory``) the first time that an
+    attribute or other operation is used on the proxy, and is reused after
+    that. Errors from the factory, such as :class:`click.BadParameter`, are
+    raised at that point. Attribute access, item access, iteration,
+    calling, context management, arithmetic, comparison, and conversion
+    (e.g., ``int()``, indexing sequences, or :func:`os.fspath`) are all
+    forwarded to the object. Use :func:`.resolve_lazy` to get the
+    underlying object, and :func:`.is_resolved` to check whether it has
+    been created.
+
+    Parameters
+    ----------
+    factory : Callable[[], Any]
+        function that creates the object
+    """
+    # private names are mangled, so they don't hide the object's attributes
+    __slots__ = ('__factory', '__value')
+    __UNSET = object()
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_LazyResult__factory', factory)
+        object.__setattr__(self, '_LazyResult__value', LazyResult.__UNSET)
+
+    def __resolve(self):
+        value = object.__getattribute__(self, '_LazyResult__value')
+        if value is LazyResult.__UNSET:
+            value = object.__getattribute__(self, '_LazyResult__factory')()
+            object.__setattr__(self, '_LazyResult__value', value)
+            object.__setattr__(self, '_LazyResult__factory', None)
+        return value
+
+    def __is_resolved(self):
+        value = object.__getattribute__(self, '_LazyResult__value')
+        return value is not LazyResult.__UNSET
+
+    # makes isinstance checks see the wrapped object's class
+    @property
+    def __class__(self):
+        return type(self.__resolve())
+
+    def __getattr__(self, name):
+        return getattr(self.__resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.__resolve(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self.__resolve(), name)
+
+    def __repr__(self):
+        return repr(self.__resolve())
+
+    def __str__(self):
+        return str(self.__resolve())
+
+    def __format__(self, format_spec):
+        return format(self.__resolve(), format_spec)
+
+    def __bytes__(self):
+        return bytes(self.__resolve())
+
+    def __bool__(self):
+        return bool(self.__resolve())
+
+    def __int__(self):
+        return int(self.__resolve())
+
+    def __float__(self):
+        return float(self.__resolve())
+
+    def __complex__(self):
+        return complex(self.__resolve())
+
+    def __index__(self):
+        return operator.index(self.__resolve())
+
+    def __round__(self, *ndigits):
+        return round(self.__resolve(), *ndigits)
+
+    def __fspath__(self):
+        return os.fspath(self.__resolve())
+
+    def __hash__(self):
+        return hash(self.__resolve())
+
+    def __len__(self):
+        return len(self.__resolve())
+
+    def __iter__(self):
+        return iter(self.__resolve())
+
+    def __reversed__(self):
+        return reversed(self.__resolve())
+
+    def __contains__(self, item):
+        return item in self.__resolve()
+
+    def __getitem__(self, key):
+        return self.__resolve()[key]
+
+    def __setitem__(self, key, value):
+        self.__resolve()[key] = value
+
+    def __delitem__(self, key):
+        del self.__resolve()[key]
+
+    def __call__(self, *args, **kwargs):
+        return self.__resolve()(*args, **kwargs)
+
+    def __enter__(self):
+        return self.__resolve().__enter__()
+
+    def __exit__(self, *exc_info):
+        return self.__resolve().__exit__(*exc_info)
+
+
+def _forward_operator(op, reflected=False):
+    if reflected:
+        def method(self, other):
+            return op(other, resolve_lazy(self))
+    else:
+        def method(self, other):
+            return op(resolve_lazy(self), other)
+    return method
+
+
+def _forward_unary(op):
+    def method(self):
+        return op(resolve_lazy(self))
+    return method
+
+
+for _name in ['lt', 'le', 'eq', 'ne', 'gt', 'ge']:
+    setattr(LazyResult, f"__{_name}__",
+            _forward_operator(getattr(operator, f"__{_name}__")))
+
+for _name in ['add', 'sub', 'mul', 'matmul', 'truediv', 'floordiv', 'mod',
+              'pow', 'lshift', 'rshift', 'and', 'xor', 'or']:
+    _op = getattr(operator, f"__{_name}__")
+    setattr(LazyResult, f"__{_name}__", _forward_operator(_op))
+    setattr(LazyResult, f"__r{_name}__",
+            _forward_operator(_op, reflected=True))
+    # in-place operators give the result (the object itself, if mutable)
+    setattr(LazyResult, f"__i{_name}__",
+            _forward_operator(getattr(operator, f"__i{_name}__")))
+
+LazyResult.__divmod__ = _forward_operator(divmod)
+LazyResult.__rdivmod__ = _forward_operator(divmod, reflected=True)
+
+for _name in ['neg', 'pos', 'abs', 'invert']:
+    setattr(LazyResult, f"__{_name}__",
+            _forward_unary(getattr(operator, f"__{_name}__")))
+
+del _name, _op
+
+
+def resolve_lazy(obj):
+    """Return the object behind a :class:`.LazyResult` (creating it if
+    needed); other objects are returned unchanged.
+    """
+    if type(obj) is LazyResult:  # isinstance would resolve the proxy
+        return obj._LazyResult__resolve()
+    return obj
+
+
+def is_resolved(obj):
+    """Whether the object behind a :class:`.LazyResult` has been created.
+
+    Always True for objects that are not a :class:`.LazyResult`.
+    """
+    if type(obj) is LazyResult:
+        return obj._LazyResult__is_resolved()
+    return True
+
+
 class AbstractParameter:
     """
     Abstract wrapper for click parameters.
@@ -16,17 +224,29 @@ class AbstractParameter:
         Arguments to pass to click parameter
     getter : Callable
         function to create desired object from user input and context dict;
-        default behavior is to return user input; keyword-only
+        default behavior is to return user input; keyword-only. This may be
+        an ``async`` function.
+    depends_on : Iterable[str]
+        labels of other parameters that this parameter's getter needs in its
+        context dict; used by :func:`.resolve_parameters`; keyword-only
+    lazy : bool
+        if True, :meth:`.get` returns a :class:`.LazyResult` that only runs
+        the getter when the object is first used; keyword-only. Only
+        :meth:`.get` is lazy: :meth:`.get_async`, :meth:`.get_many`, and
+        :func:`.resolve_parameters` always run the getter immediately.
     kwargs :
         Keyword arguments to pass to click parameter
     """
     decorator = _decorator_not_implemented
-    def __init__(self, *args, getter=None, **kwargs):
+    def __init__(self, *args, getter=None, depends_on=(), lazy=False,
+                 **kwargs):
         self.args = args
         self.kwargs = kwargs
         if getter is None:
             getter = lambda user_input, context: user_input
         self.getter = getter
+        self.depends_on = tuple(depends_on)
+        self.lazy = lazy
 
     def parameter(self, **kwargs):
         """Return the click decorator for this parameter
@@ -57,8 +277,83 @@ class AbstractParameter:
             input as handled by click decorators
         context : Dict[str, Any]
             dict mapping labels to other objects that may be used by this.
+
+        Returns
+        -------
+        Any :
+            the object; a :class:`.LazyResult` proxy for it if this
+            parameter is lazy
         """
-        return self.getter(user_input, context)
+        if self.lazy:
+            return LazyResult(lambda: self._get(user_input, context))
+        return self._get(user_input, context)
+
+    def _trace_span(self):
+        param = self.args[0] if self.args else None
+        return trace_span("AbstractParameter.get", "params", param=param)
+
+    def _get(self, user_input, context):
+        with self._trace_span():
+            result = self.getter(user_input, context)
+            if inspect.isawaitable(result):
+                result = _run_sync(result)
+        return result
+
+    async def get_async(self, user_input, context=None):
+        """Convert user input to library object, without blocking.
+
+        Async getters are awaited; synchronous getters are run in a worker
+        thread, so that several parameters can be resolved concurrently
+        (see :func:`.resolve_parameters`).
+
+        Parameters
+        ----------
+        user_input :
+            input as handled by click decorators
+        context : Dict[str, Any]
+            dict mapping labels to other objects that may be used by this.
+        """
+        get_async = getattr(self.getter, 'get_async', None)
+        if get_async is not None:
+            with self._trace_span():
+                return await get_async(user_input, context)
+        if _is_async(self.getter):
+            with self._trace_span():
+                return await self.getter(user_input, context)
+        # like get(), this runs any awaitable that the getter returns (e.g.,
+        # from a BatchStrategy with an async get_many)
+        return await asyncio.to_thread(self._get, user_input, context)
+
+    def get_many(self, user_inputs, context=None):
+        """Convert several user inputs to library objects.
+
+        This is for parameters that take multiple values (e.g., with
+        ``nargs=-1`` or ``multiple=True``). If the getter has a
+        ``get_many`` method (such as :meth:`.MultiStrategyGetter.get_many`)
+        all inputs are passed to it at once; otherwise the getter is called
+        once per input.
+
+        Parameters
+        ----------
+        user_inputs : Iterable
+            inputs as handled by click decorators
+        context : Dict[str, Any]
+            dict mapping labels to other objects that may be used by this.
+
+        Returns
+        -------
+        List :
+            converted objects, in the same order as the inputs
+        """
+        user_inputs = list(user_inputs)
+        get_many = getattr(self.getter, 'get_many', None)
+        if get_many is not None:
+            with self._trace_span():
+                results = get_many(user_inputs, context)
+                if inspect.isawaitable(results):
+                    results = _run_sync(results)
+            return results
+        return [self._get(user_input, context) for user_input in user_inputs]
 
 
 class Option(AbstractParameter):
@@ -74,6 +369,35 @@ class Argument(AbstractParameter):
 NOT_PARSED = object()
 
 
+class BatchStrategy:
+    """Strategy for :class:`.MultiStrategyGetter` with a vectorized form.
+
+    When a :class:`.MultiStrategyGetter` resolves several inputs at once,
+    it passes all the inputs that are still unresolved to ``get_many`` in
+    a single call (e.g., to scan an index once for many names).
+
+    Parameters
+    ----------
+    get_many : Callable[List, Dict[str, Any], List]
+        function taking a list of user inputs and the context dict, and
+        returning a list with the created object for each input, or
+        ``NOT_PARSED`` for inputs this strategy can't handle. This may be
+        an ``async`` function.
+    """
+    def __init__(self, get_many):
+        self.get_many = get_many
+
+    def __call__(self, user_input, context):
+        found = self.get_many([user_input], context)
+        if inspect.isawaitable(found):
+            return self._first(found)
+        return found[0]
+
+    @staticmethod
+    async def _first(awaitable):
+        return (await awaitable)[0]
+
+
 class MultiStrategyGetter:
     """
     Callable that combines attempts multiple strategies to parse user input.
@@ -86,10 +410,76 @@ class MultiStrategyGetter:
     error_message : str
         message to provide if no object found; ``.format`` will be used to
         expand ``user_input``
+    cache_size : int or None
+        if given, successful results are memoized in an LRU cache with at
+        most this many entries; default (None) does not cache
+    cache_context_keys : Iterable[str]
+        keys of the context dict that the result depends on; their values
+        are part of the cache key (other context is ignored by the cache)
+    adaptive : bool
+        if True, strategies are tried in order of how often they have
+        succeeded, instead of in the given order. Only use this if at most
+        one strategy can succeed for any given input.
     """
-    def __init__(self, strategies, error_message):
+    def __init__(self, strategies, error_message, cache_size=None,
+                 cache_context_keys=(), adaptive=False):
         self.strategies = strategies
         self.error_message = error_message
+        self.cache_size = cache_size
+        self.cache_context_keys = tuple(cache_context_keys)
+        self.adaptive = adaptive
+        self.successes = [0] * len(strategies)
+        self._cache = collections.OrderedDict()
+
+    def clear_cache(self):
+        """Remove all memoized results"""
+        self._cache.clear()
+
+    def _cache_key(self, user_input, context):
+        key = (user_input,
+               tuple(context.get(k) for k in self.cache_context_keys))
+        try:
+            hash(key)
+        except TypeError:
+            return None  # can't cache unhashable inputs
+        return key
+
+    def _strategy_order(self):
+        order = range(len(self.strategies))
+        if self.adaptive:
+            # sorted is stable, so ties keep the declared order
+            order = sorted(order, key=lambda idx: -self.successes[idx])
+        return order
+
+    def _resolve(self, user_input, context):
+        for idx in self._strategy_order():
+            found = self.strategies[idx](user_input, context)
+            if inspect.isawaitable(found):
+                found = _run_sync(found)
+            if found is not NOT_PARSED:
+                self.successes[idx] += 1
+                return found
+
+        raise click.BadParameter(
+            self.error_message.format(user_input=user_input)
+        )
+
+    def _cache_lookup(self, user_input, context):
+        """Return (cache key, cached result or NOT_PARSED)"""
+        if not self.cache_size:
+            return None, NOT_PARSED
+        key = self._cache_key(user_input, context)
+        if key is None or key not in self._cache:
+            return key, NOT_PARSED
+        self._cache.move_to_end(key)
+        return key, self._cache[key]
+
+    def _cache_store(self, key, found):
+        if key is None:
+            return
+        self._cache[key] = found
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
 
     def __call__(self, user_input, context=None):
         """
@@ -104,11 +494,196 @@ class MultiStrategyGetter:
         if context is None:
             context = {}
 
-        for strategy in self.strategies:
-            found = strategy(user_input, context)
+        key, found = self._cache_lookup(user_input, context)
+        if found is not NOT_PARSED:
+            return found
+
+        found = self._resolve(user_input, context)
+        self._cache_store(key, found)
+        return found
+
+    async def get_async(self, user_input, context=None):
+        """Asynchronous version of calling this getter.
+
+        Async strategies are awaited; synchronous strategies are run in a
+        worker thread.
+
+        Parameters
+        ----------
+        user_input :
+            parameter as handled by click decorators
+        context : Dict
+            mapping of str to additional information available to help
+            create this object
+        """
+        if context is None:
+            context = {}
+
+        key, found = self._cache_lookup(user_input, context)
+        if found is not NOT_PARSED:
+            return found
+
+        for idx in self._strategy_order():
+            strategy = self.strategies[idx]
+            if _is_async(strategy):
+                found = await strategy(user_input, context)
+            else:
+                found = await asyncio.to_thread(strategy, user_input,
+                                                context)
+                if inspect.isawaitable(found):
+                    found = await found
             if found is not NOT_PARSED:
+                self.successes[idx] += 1
+                self._cache_store(key, found)
                 return found
 
         raise click.BadParameter(
             self.error_message.format(user_input=user_input)
         )
+
+    def get_many(self, user_inputs, context=None):
+        """Resolve several user inputs at once.
+
+        Each strategy is called once with all inputs that are still
+        unresolved: strategies with a ``get_many`` method (see
+        :class:`.BatchStrategy`) receive them as a list, others are called
+        once per input.
+
+        Parameters
+        ----------
+        user_inputs : Iterable
+            parameters as handled by click decorators
+        context : Dict
+            mapping of str to additional information available to help
+            create these objects
+
+        Returns
+        -------
+        List :
+            created objects, in the same order as the inputs
+        """
+        if context is None:
+            context = {}
+
+        user_inputs = list(user_inputs)
+        results = []
+        keys = []
+        for user_input in user_inputs:
+            key, found = self._cache_lookup(user_input, context)
+            keys.append(key)
+            results.append(found)
+
+        pending = [i for i, found in enumerate(results)
+                   if found is NOT_PARSED]
+        for idx in self._strategy_order():
+            if not pending:
+                break
+            strategy = self.strategies[idx]
+            inputs = [user_inputs[i] for i in pending]
+            get_many = getattr(strategy, 'get_many', None)
+            if get_many is not None:
+                found_list = get_many(inputs, context)
+                if inspect.isawaitable(found_list):
+                    found_list = _run_sync(found_list)
+                found_list = list(found_list)
+                if len(found_list) != len(inputs):
+                    raise ValueError(
+                        f"Batch strategy {strategy!r} returned "
+                        f"{len(found_list)} results for {len(inputs)} "
+                        "inputs"
+                    )
+            else:
+                found_list = [strategy(user_input, context)
+                              for user_input in inputs]
+                if any(inspect.isawaitable(found) for found in found_list):
+                    found_list = _run_sync(_gather_results(found_list))
+
+            still_pending = []
+            for i, found in zip(pending, found_list):
+                if found is NOT_PARSED:
+                    still_pending.append(i)
+                else:
+                    self.successes[idx] += 1
+                    results[i] = found
+                    self._cache_store(keys[i], found)
+            pending = still_pending
+
+        if pending:
+            raise click.BadParameter("; ".join(
+                self.error_message.format(user_input=user_inputs[i])
+                for i in pending
+            ))
+
+        return results
+
+
+async def resolve_parameters_async(requests, context=None):
+    """Resolve several parameters concurrently, respecting dependencies.
+
+    Coroutine version of :func:`.resolve_parameters`, for use when an event
+    loop is already running.
+    """
+    context = dict(context) if context is not None else {}
+    graph = {}
+    for label, (param, _) in requests.items():
+        missing = [dep for dep in param.depends_on
+                   if dep not in requests and dep not in context]
+        if missing:
+            raise ValueError(f"Parameter '{label}' depends on unknown "
+                             f"parameters: {missing}")
+        graph[label] = [dep for dep in param.depends_on if dep in requests]
+
+    # raises graphlib.CycleError (a ValueError) for circular dependencies
+    sorter = graphlib.TopologicalSorter(graph)
+    sorter.prepare()
+
+    results = {}
+    tasks = {}
+    try:
+        while sorter.is_active():
+            for label in sorter.get_ready():
+                param, user_input = requests[label]
+                task = asyncio.ensure_future(param.get_async(user_input,
+                                                             context))
+                tasks[task] = label
+
+            done, _ = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                label = tasks.pop(task)
+                # each result is added to the context for its dependents
+                results[label] = context[label] = task.result()
+                sorter.done(label)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return {label: results[label] for label in requests}
+
+
+def resolve_parameters(requests, context=None):
+    """Resolve several parameters concurrently, respecting dependencies.
+
+    Parameters are resolved in dependency order (see the ``depends_on``
+    argument of :class:`.AbstractParameter`): the result for each label is
+    added to the context dict before any parameter that depends on it is
+    resolved, so each parameter is resolved exactly once. Independent
+    parameters are resolved concurrently: async getters on an event loop,
+    synchronous getters in worker threads. The total time is therefore
+    close to that of the slowest chain of dependencies rather than the sum
+    of all parameters.
+
+    Parameters
+    ----------
+    requests : Dict[str, Tuple[:class:`.AbstractParameter`, Any]]
+        mapping of a label to the parameter and its user input
+    context : Dict[str, Any]
+        initial context dict for all getters; this is copied, not modified
+
+    Returns
+    -------
+    Dict[str, Any] :
+        mapping of each label to its resolved object
+    """
+    return asyncio.run(resolve_parameters_async(requests, context))
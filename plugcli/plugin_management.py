@@ -1,12 +1,76 @@
 import collections
+import collections.abc
+import contextlib
 import pkgutil
 import importlib
+import importlib.machinery
+import importlib.metadata
+import importlib.util
+import io
+import json
+import marshal
+import re
 import warnings
 import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from .profiling import profile_candidate
+from .registry import normalize_name
+from .tracing import trace_span
+from .static_discovery import static_index_entries
 
 class PluginRegistrationError(RuntimeError):
     pass
 
+
+class PluginCompatibilityError(PluginRegistrationError):
+    """Raised when a plugin requires a newer library or CLI version"""
+
+
+_VERSION_STRING = re.compile(r"\d+(\.\d+)*")
+
+
+def _as_version(version):
+    """Version as a tuple of ints (or None).
+
+    Strings such as ``"1.0.0"`` are parsed; only the leading release
+    numbers are used, so ``"2.1.0.dev0"`` gives ``(2, 1, 0)``.
+    """
+    if version is None:
+        return None
+    if isinstance(version, str):
+        match = _VERSION_STRING.match(version)
+        if match is None:
+            raise ValueError(f"Unable to parse version '{version}'")
+        return tuple(int(part) for part in match.group().split("."))
+    try:
+        version = tuple(version)
+    except TypeError:
+        raise TypeError("Version must be a string or a tuple of ints, "
+                        f"not {version!r}") from None
+    if not all(isinstance(part, int) for part in version):
+        raise TypeError("Version must be a string or a tuple of ints, "
+                        f"not {version!r}")
+    return version
+
+
+def _read_source(path):
+    """Source code in a file, or None if it isn't valid UTF-8"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        return None  # the loader will report the problem, if any
+
+
+def _version_less(version, other):
+    """Compare versions, padding with zeros so that (1, 0) == (1, 0, 0)"""
+    length = max(len(version), len(other))
+    return (version + (0,) * (length - len(version))
+            < other + (0,) * (length - len(other)))
+
+
 class Plugin(object):
     """Generic plugin object
 
@@ -19,6 +83,10 @@ class Plugin(object):
         tuple representing hte minimum allowed version of the command line
         interface application
     """
+    # slots keep plugins small; subclasses without __slots__ still get a
+    # __dict__ for their own attributes
+    __slots__ = ('requires_lib', 'requires_cli', 'location', 'plugin_type')
+
     def __init__(self, requires_lib, requires_cli):
         self.requires_lib = requires_lib
         self.requires_cli = requires_cli
@@ -29,8 +97,10 @@ class Plugin(object):
         # error is already registered and data doesn't match
         error_condition = (
             (self.location is not None or self.plugin_type is not None)
-            and (self.location != location
-                 or self.plugin_type != plugin_type)
+            # compare types first: locations of different loader types
+            # may not be comparable (e.g., entry points and modules)
+            and (self.plugin_type != plugin_type
+                 or self.location != location)
         )
         if error_condition:  # -no-cov-
             msg = (
@@ -45,20 +115,128 @@ class Plugin(object):
 
 class CommandPlugin(Plugin):
     """Mix-in class for command plugins.
+
+    Parameters
+    ----------
+    command : :class:`click.Command`
+        the command provided by this plugin
+    section : str
+        help section for the command
+    short_help : str or None
+        short help for the command, as shown in the CLI's help; default
+        (None) uses the command's ``short_help``. Giving it here allows it to
+        be determined without importing the plugin.
     """
-    def __init__(self, command, section, **kwargs):
+    __slots__ = ('command', 'section', '_short_help')
+
+    def __init__(self, command, section, short_help=None, **kwargs):
         self.command = command
         self.section = section
+        self._short_help = short_help
         super().__init__(**kwargs)
 
     @property
     def name(self):
         return self.command.name
 
+    @property
+    def short_help(self):
+        if self._short_help is not None:
+            return self._short_help
+        return self.command.short_help
+
     def __repr__(self):
         return f"{self.__class__.__name__}({self.name})"
 
 
+class LazyCommandPlugin(CommandPlugin):
+    """Command plugin that only imports its command when it is needed.
+
+    This carries the metadata needed to register a command (name, section,
+    short help) without importing the module that defines it. The real
+    plugin is loaded, using the loader that created this object, the first
+    time :attr:`.command` is accessed.
+
+    Parameters
+    ----------
+    name : str
+        name of the command
+    section : str
+        help section for the command
+    location : str
+        key for the candidate module that contains the real plugin (see
+        :meth:`.CLIPluginLoader.index`)
+    loader : :class:`.CLIPluginLoader`
+        loader used to load the real plugin
+    short_help : str or None
+        short help for the command
+    requires_lib: tuple
+        tuple representing the minimum allowed version of the underlying
+        library
+    requires_cli: tuple
+        tuple representing the minimum allowed version of the command line
+        interface application
+    """
+    __slots__ = ('_name', 'loader', '_plugin')
+
+    def __init__(self, name, section, location, loader, short_help=None,
+                 requires_lib=None, requires_cli=None):
+        # skip CommandPlugin.__init__; command is loaded on demand
+        Plugin.__init__(self, requires_lib=requires_lib,
+                        requires_cli=requires_cli)
+        self._name = name
+        self.section = section
+        self._short_help = short_help
+        self.loader = loader
+        self._plugin = None
+        self.attach_metadata(location, loader.plugin_type)
+
+    @classmethod
+    def from_index_entry(cls, entry, loader):
+        """Create a lazy plugin from an entry of a loader's index.
+
+        Parameters
+        ----------
+        entry : Dict[str, Any]
+            index entry, as created by :meth:`.CLIPluginLoader.index`
+        loader : :class:`.CLIPluginLoader`
+            loader used to load the real plugin
+        """
+        def as_tuple(version):
+            return tuple(version) if version is not None else None
+
+        return cls(name=entry['name'],
+                   section=entry['section'],
+                   location=entry['location'],
+                   loader=loader,
+                   short_help=entry.get('short_help'),
+                   requires_lib=as_tuple(entry.get('requires_lib')),
+                   requires_cli=as_tuple(entry.get('requires_cli')))
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def short_help(self):
+        return self._short_help
+
+    @property
+    def is_loaded(self):
+        return self._plugin is not None
+
+    @property
+    def plugin(self):
+        """:class:`.CommandPlugin` : the real plugin (loaded on access)"""
+        if self._plugin is None:
+            self._plugin = self.loader.load_plugin(self.location, self.name)
+        return self._plugin
+
+    @property
+    def command(self):
+        return self.plugin.command
+
+
 class CLIPluginLoader(object):
     """Abstract object for CLI plugins
 
@@ -79,18 +257,82 @@ class CLIPluginLoader(object):
 
     Parameters
     ----------
-    plugin_type : Literal["file", "namespace"]
+    plugin_type : Literal["file", "namespace", "entry_point", "bundle"]
         the type of file
     search_path : str
-        the directory or namespace to search for plugins
+        the directory, namespace, or entry point group to search for
+        plugins
     plugin_class: type
         plugins are identified as instances of this class (override in
         ``_is_my_plugin``)
+    max_workers : int or None
+        if given, candidates are loaded concurrently by a thread pool with
+        this many workers; default (None) loads them sequentially
+    static : bool
+        if True, :meth:`.index` tries to find command plugins by parsing
+        each candidate's source code (see :mod:`plugcli.static_discovery`),
+        and only executes candidates where that isn't possible
+    lib_version : tuple or str or None
+        version of the underlying library (e.g., ``(2, 1)`` or ``"2.1.0"``);
+        plugins whose ``requires_lib`` is greater are incompatible. Default
+        (None) doesn't check.
+    cli_version : tuple or str or None
+        version of the CLI application; plugins whose ``requires_cli`` is
+        greater are incompatible. Default (None) doesn't check.
+    incompatible : Literal["skip", "warn", "error"]
+        what to do with incompatible plugins: skip them silently, skip them
+        with a warning (default), or raise a
+        :class:`.PluginCompatibilityError`. Plugins from
+        :meth:`.lazy_plugins` are checked using the index, before they are
+        imported.
     """
-    def __init__(self, plugin_type, search_path, plugin_class=Plugin):
+    # whether _find_candidates loads (and profiles) the candidates, instead
+    # of _make_nsdict
+    _find_candidates_loads = False
+
+    def __init__(self, plugin_type, search_path, plugin_class=Plugin,
+                 max_workers=None, static=False, lib_version=None,
+                 cli_version=None, incompatible="warn"):
+        if incompatible not in ("skip", "warn", "error"):
+            raise ValueError("incompatible must be one of 'skip', 'warn', "
+                             f"or 'error', not '{incompatible}'")
         self.plugin_type = plugin_type
         self.search_path = search_path
         self.plugin_class = plugin_class
+        self.max_workers = max_workers
+        self.static = static
+        self.lib_version = _as_version(lib_version)
+        self.cli_version = _as_version(cli_version)
+        self.incompatible = incompatible
+        self._loaded_candidates = {}
+        self._incompatibilities = {}
+
+    def _map(self, func, items):
+        """Apply ``func`` to each item, concurrently if requested.
+
+        Results are returned in the same order as ``items``, regardless of
+        the order in which they finish.
+        """
+        items = list(items)
+        if self.max_workers is None or len(items) < 2:
+            return [func(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(func, items))
+
+    def _imap(self, func, items):
+        """Like :meth:`._map`, but generate results as they are consumed.
+
+        When running concurrently, all items are submitted at once, but
+        each result is released by the executor once it has been yielded.
+        """
+        if self.max_workers is None:
+            for item in items:
+                yield func(item)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            yield from executor.map(func, items)
 
     # TODO: this should be _find_candidate_modules
     def _find_candidates(self):
@@ -100,63 +342,403 @@ class CLIPluginLoader(object):
     def _make_nsdict(candidate):
         raise NotImplementedError()
 
+    @contextlib.contextmanager
+    def _profile(self, key):
+        """Record loading a candidate, if profiling or tracing is enabled"""
+        with trace_span("load_candidate", "plugin", candidate=key,
+                        plugin_type=self.plugin_type):
+            with profile_candidate(key, self.plugin_type):
+                yield
+
     def _find_candidate_namespaces(self):
-        candidates = self._find_candidates()
-        namespaces = {cand: self._make_nsdict(cand) for cand in candidates}
-        return namespaces
+        """Generate (candidate, nsdict) pairs, loading candidates lazily"""
+        def make_nsdict(candidate):
+            if self._find_candidates_loads:
+                return candidate, self._make_nsdict(candidate)
+            with self._profile(self._candidate_key(candidate)):
+                return candidate, self._make_nsdict(candidate)
+
+        with trace_span("find_candidates", "plugin"):
+            candidates = self._find_candidates()
+        return self._imap(make_nsdict, candidates)
 
     def _is_my_plugin(self, obj):
         return isinstance(obj, self.plugin_class)
 
     def _find_plugins(self, namespaces):
-        for loc, ns in namespaces.items():
-            for obj in ns.values():
-                if self._is_my_plugin(obj):
-                    obj.attach_metadata(loc, self.plugin_type)
-                    yield obj
+        """Generate the plugins in (location, nsdict) pairs.
+
+        Each namespace is released once its plugins have been found, so
+        only the namespaces that plugins refer to (e.g., as the globals of
+        their commands) stay in memory.
+        """
+        if isinstance(namespaces, collections.abc.Mapping):
+            namespaces = namespaces.items()
+        for loc, ns in namespaces:
+            plugins = [obj for obj in ns.values() if self._is_my_plugin(obj)]
+            del ns
+            for obj in plugins:
+                obj.attach_metadata(loc, self.plugin_type)
+                yield obj
 
     def __call__(self):
-        namespaces = self._find_candidate_namespaces()
+        name = f"{self.__class__.__name__}.__call__"
+        with trace_span(name, "plugin", search_path=str(self.search_path)):
+            namespaces = self._find_candidate_namespaces()
+            plugins = [plugin for plugin in self._find_plugins(namespaces)
+                       if self._check_compatible(plugin.requires_lib,
+                                                 plugin.requires_cli,
+                                                 description=repr(plugin))]
+        return plugins
+
+    @staticmethod
+    def _requirement_reason(label, required, available):
+        """Why a single requirement isn't met (or None)"""
+        if required is None or available is None:
+            return None
+        try:
+            required_version = _as_version(required)
+        except (TypeError, ValueError):
+            return f"has an invalid {label} version requirement {required!r}"
+        if _version_less(available, required_version):
+            return (f"requires {label} version {required_version} "
+                    f"(found {available})")
+        return None
+
+    def _incompatibility(self, requires_lib, requires_cli):
+        """Why plugins with these requirements are incompatible (or None).
+
+        Results are cached, since many plugins share requirements.
+        """
+        # JSON (e.g., from an index) stores tuples as lists
+        key = tuple(tuple(req) if isinstance(req, list) else req
+                    for req in (requires_lib, requires_cli))
+        try:
+            return self._incompatibilities[key]
+        except KeyError:
+            pass
+        except TypeError:
+            key = None  # unhashable requirement; don't cache
+
+        reasons = [
+            self._requirement_reason(label, required, available)
+            for label, required, available in [
+                ("library", requires_lib, self.lib_version),
+                ("CLI", requires_cli, self.cli_version),
+            ]
+        ]
+        reasons = [reason for reason in reasons if reason is not None]
+        reason = " and ".join(reasons) if reasons else None
+        if key is not None:
+            self._incompatibilities[key] = reason
+        return reason
+
+    def _check_compatible(self, requires_lib, requires_cli, description):
+        """Whether to keep a plugin, applying the ``incompatible`` policy"""
+        if self.lib_version is None and self.cli_version is None:
+            return True  # nothing to check against
+
+        reason = self._incompatibility(requires_lib, requires_cli)
+        if reason is None:
+            return True
+
+        msg = f"Plugin {description} {reason}"
+        if self.incompatible == "error":
+            raise PluginCompatibilityError(msg)
+        if self.incompatible == "warn":
+            warnings.warn(msg)
+        return False
+
+    def _candidate_key(self, candidate):
+        """Serializable key identifying a candidate module"""
+        return str(candidate)
+
+    def _candidate_from_key(self, key):
+        """Inverse of :meth:`._candidate_key`"""
+        return key
+
+    @staticmethod
+    def _index_entry(plugin, location):
+        return {
+            'name': plugin.name,
+            'section': plugin.section,
+            'short_help': plugin.short_help,
+            'location': location,
+            'requires_lib': plugin.requires_lib,
+            'requires_cli': plugin.requires_cli,
+        }
+
+    def _find_candidate_keys(self):
+        """Keys for all candidates, preferably without loading them"""
+        return [self._candidate_key(cand) for cand in self._find_candidates()]
+
+    def _candidate_fingerprints(self):
+        """Cheap fingerprint for each candidate, without loading it.
+
+        This is used to determine whether cached discovery results for a
+        candidate are still valid.
+
+        Returns
+        -------
+        Dict[str, Any] :
+            mapping of candidate key to a JSON-serializable fingerprint
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def _stat_fingerprint(path):
+        try:
+            stat = os.stat(path)
+        except (OSError, TypeError):
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _candidate_source(self, key):
+        """Source code for a candidate, if available (without loading it)
+        """
+        return None
+
+    def _static_index_candidate(self, key):
+        source = self._candidate_source(key)
+        if source is None:
+            return None
+        class_name = self.plugin_class.__name__
+        return static_index_entries(source, location=key,
+                                    plugin_class_name=class_name,
+                                    filename=key)
+
+    def _index_candidate(self, key):
+        if self.static:
+            entries = self._static_index_candidate(key)
+            if entries is not None:
+                return entries
+
+        return [self._index_entry(plugin, key)
+                for plugin in self.load_candidate(key)]
+
+    def index(self):
+        """Metadata needed to register the command plugins lazily.
+
+        Unless the loader is ``static``, this loads all candidates (like
+        calling the loader does), so it is intended to be run once and
+        stored, e.g., when packaging the application or in a
+        :class:`.DiscoveryCache`. Only works for command plugins.
+
+        Returns
+        -------
+        List[Dict[str, Any]] :
+            JSON-serializable index entries, one per plugin
+        """
+        name = f"{self.__class__.__name__}.index"
+        with trace_span(name, "plugin", search_path=str(self.search_path)):
+            with trace_span("find_candidates", "plugin"):
+                keys = self._find_candidate_keys()
+            indices = self._map(self._index_candidate, keys)
+        return [entry for index in indices for entry in index]
+
+    def lazy_plugins(self, index):
+        """Create lazy plugins from a previously created index.
+
+        Parameters
+        ----------
+        index : List[Dict[str, Any]]
+            index as created by :meth:`.index`
+
+        Returns
+        -------
+        List[:class:`.LazyCommandPlugin`] :
+            plugins that only load their command when it is needed;
+            incompatible plugins are handled according to the loader's
+            ``incompatible`` policy, without loading them
+        """
+        def description(entry):
+            return f"'{entry['name']}' from {entry['location']}"
+
+        return [LazyCommandPlugin.from_index_entry(entry, loader=self)
+                for entry in index
+                if self._check_compatible(entry.get('requires_lib'),
+                                          entry.get('requires_cli'),
+                                          description=description(entry))]
+
+    def load_candidate(self, key):
+        """Load all plugins from a single candidate module.
+
+        Results are cached, so each candidate is only loaded once.
+
+        Parameters
+        ----------
+        key : str
+            key identifying the candidate (as in :meth:`.index`)
+        """
+        try:
+            return self._loaded_candidates[key]
+        except KeyError:
+            pass
+
+        with self._profile(key):
+            candidate = self._candidate_from_key(key)
+            namespaces = [(candidate, self._make_nsdict(candidate))]
+
         plugins = list(self._find_plugins(namespaces))
+        self._loaded_candidates[key] = plugins
         return plugins
 
+    def load_plugin(self, key, name):
+        """Load the plugin with a given name from a single candidate.
+
+        Parameters
+        ----------
+        key : str
+            key identifying the candidate (as in :meth:`.index`)
+        name : str
+            name of the plugin
+        """
+        plugins = {p.name: p for p in self.load_candidate(key)}
+        try:
+            return plugins[name]
+        except KeyError:
+            raise PluginRegistrationError(
+                f"Plugin '{name}' was not found in '{key}'"
+            )
+
 
 class FilePluginLoader(CLIPluginLoader):
     """File-based plugins (quick and dirty)
 
+    Several directories can be searched, in order of precedence: if a
+    plugin file with the same name is in more than one directory, the file
+    in the earliest directory shadows the others. Likewise, a command
+    plugin is skipped if an earlier directory already provides a command
+    with the same (normalized) name. A warning is given once for each
+    shadowed file or command.
+
     Parameters
     ----------
-    search_path : str
-        path to the directory that contains plugins (OS-dependent format)
+    search_path : str or List[str]
+        path to the directory that contains plugins (OS-dependent format),
+        or a list of such directories, highest precedence first
     plugin_class: type
         plugins are identified as instances of this class (override in
         ``_is_my_plugin``)
+    kwargs :
+        options shared by all loaders, passed to :class:`.CLIPluginLoader`
+        (``max_workers``, ``static``, ``lib_version``, ``cli_version``, and
+        ``incompatible``)
     """
-    def __init__(self, search_path, plugin_class):
+    def __init__(self, search_path, plugin_class, **kwargs):
         super().__init__(plugin_type="file", search_path=search_path,
-                         plugin_class=plugin_class)
+                         plugin_class=plugin_class, **kwargs)
+        self._directory_scans = {}
+        self._reported_shadowed = set()
 
-    def _find_candidates(self):
-        def is_plugin(filename):
-            return (
-                filename.endswith(".py") and not filename.startswith("_")
-                and not filename.startswith(".")
-            )
+    @property
+    def search_paths(self):
+        """List[str] : directories to search, highest precedence first"""
+        if isinstance(self.search_path, (list, tuple)):
+            return [os.fspath(path) for path in self.search_path]
+        return [os.fspath(self.search_path)]
+
+    @staticmethod
+    def _is_plugin_file(filename):
+        return (
+            filename.endswith(".py") and not filename.startswith("_")
+            and not filename.startswith(".")
+        )
+
+    def _scan_directory(self, directory):
+        """Plugin filenames in a directory, sorted.
+
+        The scan is reused until the directory's modification time changes
+        (i.e., until files are added, removed, or renamed).
+        """
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return []
 
-        if not os.path.exists(os.path.join(self.search_path)):
+        cached = self._directory_scans.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with os.scandir(directory) as entries:
+                # scandir gives the file type without another stat call
+                filenames = [entry.name for entry in entries
+                             if self._is_plugin_file(entry.name)
+                             and entry.is_file()]
+        except OSError:
             return []
 
-        candidates = [os.path.join(self.search_path, f)
-                      for f in os.listdir(self.search_path)
-                      if is_plugin(f)]
-        return candidates
+        # sorted so that plugin order doesn't depend on the file system
+        filenames.sort()
+        self._directory_scans[directory] = (mtime, filenames)
+        return filenames
+
+    def _find_candidates(self):
+        found = {}
+        for directory in self.search_paths:
+            for filename in self._scan_directory(directory):
+                path = os.path.join(directory, filename)
+                if filename not in found:
+                    found[filename] = path
+                elif path not in self._reported_shadowed:
+                    self._reported_shadowed.add(path)
+                    warnings.warn(f"Plugin file '{path}' is shadowed by "
+                                  f"'{found[filename]}'")
+
+        # plugins from higher precedence directories come first
+        return list(found.values())
+
+    def _drop_shadowed_commands(self, plugins):
+        """Skip command plugins named like one from an earlier directory"""
+        precedence = {os.path.normpath(directory): rank for rank, directory
+                      in reversed(list(enumerate(self.search_paths)))}
+        provided = {}
+        for plugin in plugins:
+            name = getattr(plugin, 'name', None)
+            if name is None:  # not a command plugin
+                yield plugin
+                continue
+
+            location = os.fspath(plugin.location)
+            directory = os.path.normpath(os.path.dirname(location))
+            rank = precedence.get(directory, 0)
+            name = normalize_name(name)
+            if name not in provided:
+                provided[name] = (rank, location)
+            elif rank > provided[name][0]:
+                if (name, location) not in self._reported_shadowed:
+                    self._reported_shadowed.add((name, location))
+                    warnings.warn(f"Command '{name}' from '{location}' is "
+                                  f"shadowed by '{provided[name][1]}'")
+                continue
+            yield plugin
+
+    def __call__(self):
+        return list(self._drop_shadowed_commands(super().__call__()))
+
+    def lazy_plugins(self, index):
+        return list(self._drop_shadowed_commands(
+            super().lazy_plugins(index)
+        ))
+
+    def _candidate_fingerprints(self):
+        return {self._candidate_key(cand): self._stat_fingerprint(cand)
+                for cand in self._find_candidates()}
+
+    def _candidate_source(self, key):
+        return _read_source(key)
 
     @staticmethod
     def _make_nsdict(candidate):
+        # use the import system's source loader so that the compiled code
+        # is cached in __pycache__ (and validated against the source, per
+        # PEP 552) just like it is for normal modules
+        path = os.fspath(candidate)
+        name = os.path.splitext(os.path.basename(path))[0]
+        code = importlib.machinery.SourceFileLoader(name, path).get_code(name)
         ns = {}
-        with open(candidate, encoding='utf-8') as f:
-            code = compile(f.read(), candidate, 'exec')
-            eval(code, ns, ns)
+        eval(code, ns, ns)
         return ns
 
 
@@ -170,28 +752,285 @@ class NamespacePluginLoader(CLIPluginLoader):
     plugin_class: type
         plugins are identified as instances of this class (override in
         ``_is_my_plugin``)
+    kwargs :
+        options shared by all loaders, passed to :class:`.CLIPluginLoader`
+        (``max_workers``, ``static``, ``lib_version``, ``cli_version``, and
+        ``incompatible``)
     """
-    def __init__(self, search_path, plugin_class):
+    def __init__(self, search_path, plugin_class, **kwargs):
         super().__init__(plugin_type="namespace", search_path=search_path,
-                         plugin_class=plugin_class)
+                         plugin_class=plugin_class, **kwargs)
 
-    def _find_candidates(self):
+    def _iter_namespace(self):
         # based on https://packaging.python.org/guides/creating-and-discovering-plugins/#using-namespace-packages
-        def iter_namespace(ns_pkg):
-            return pkgutil.iter_modules(ns_pkg.__path__,
-                                        ns_pkg.__name__ + ".")
-
         try:
             ns = importlib.import_module(self.search_path)
         except ModuleNotFoundError:
-            candidates = []
-        else:
-            candidates = [
-                importlib.import_module(name)
-                for _, name, _ in iter_namespace(ns)
-            ]
+            return []
+        return pkgutil.iter_modules(ns.__path__, ns.__name__ + ".")
+
+    _find_candidates_loads = True
+
+    def _find_candidates(self):
+        def import_candidate(name):
+            with self._profile(name):
+                return importlib.import_module(name)
+
+        names = [name for _, name, _ in self._iter_namespace()]
+        candidates = self._map(import_candidate, names)
         return candidates
 
+    def _find_candidate_keys(self):
+        return [name for _, name, _ in self._iter_namespace()]
+
+    def _candidate_fingerprints(self):
+        # find the source for each submodule without importing it; a
+        # reinstalled distribution changes the stat of its files
+        fingerprints = {}
+        for finder, name, _ in self._iter_namespace():
+            spec = finder.find_spec(name)
+            origin = spec.origin if spec is not None else None
+            fingerprints[name] = self._stat_fingerprint(origin)
+        return fingerprints
+
     @staticmethod
     def _make_nsdict(candidate):
         return vars(candidate)
+
+    def _candidate_key(self, candidate):
+        return candidate.__name__
+
+    def _candidate_source(self, key):
+        # find_spec imports the parent package, but not the module itself
+        spec = importlib.util.find_spec(key)
+        origin = spec.origin if spec is not None else None
+        if origin is None or not origin.endswith(".py"):
+            return None
+        return _read_source(origin)
+
+    def _candidate_from_key(self, key):
+        return importlib.import_module(key)
+
+
+class EntryPointPluginLoader(CLIPluginLoader):
+    """Load plugins advertised as entry points of installed distributions
+
+    Each entry point in the group refers either to a plugin object (e.g.,
+    ``mycmd = my_package.commands:PLUGIN``) or to a module whose plugins
+    should be loaded (e.g., ``mycmd = my_package.commands``). Discovering
+    the entry points only reads distribution metadata; the referenced
+    objects are imported when the candidates are loaded. Use with
+    :meth:`.lazy_plugins` (e.g., through a :class:`.DiscoveryCache`) to
+    defer those imports until a command is used.
+
+    A plugin object records where it was loaded from, so the modules found
+    through entry points must not also be loaded by another loader (such as
+    a :class:`.NamespacePluginLoader` for the same package); the second
+    loader raises a :class:`.PluginRegistrationError`.
+
+    Parameters
+    ----------
+    search_path : str
+        name of the entry point group where plugins can be found
+    plugin_class: type
+        plugins are identified as instances of this class (override in
+        ``_is_my_plugin``)
+    kwargs :
+        options shared by all loaders, passed to :class:`.CLIPluginLoader`
+        (``max_workers``, ``static``, ``lib_version``, ``cli_version``, and
+        ``incompatible``)
+    """
+    def __init__(self, search_path, plugin_class, **kwargs):
+        super().__init__(plugin_type="entry_point", search_path=search_path,
+                         plugin_class=plugin_class, **kwargs)
+
+    def _find_candidates(self):
+        entry_points = importlib.metadata.entry_points(group=self.search_path)
+        # sorted so that plugin order doesn't depend on installation order;
+        # if several distributions use the same name, the first one wins
+        candidates = {}
+        for entry_point in sorted(entry_points, key=lambda ep: ep.name):
+            candidates.setdefault(entry_point.name, entry_point)
+        return list(candidates.values())
+
+    def _candidate_key(self, candidate):
+        return f"{candidate.name}={candidate.value}"
+
+    def _candidate_from_key(self, key):
+        name, value = key.split("=", 1)
+        return importlib.metadata.EntryPoint(name=name, value=value,
+                                             group=self.search_path)
+
+    @staticmethod
+    def _module_origin(module):
+        # find_spec imports the parent package, but not the module itself
+        try:
+            spec = importlib.util.find_spec(module)
+        except (ImportError, ValueError):
+            return None
+        return spec.origin if spec is not None else None
+
+    def _candidate_fingerprints(self):
+        # reinstalling or upgrading a distribution changes its version;
+        # editing the module (e.g., in an editable install) changes its stat
+        fingerprints = {}
+        for candidate in self._find_candidates():
+            dist = getattr(candidate, 'dist', None)
+            origin = self._module_origin(candidate.module)
+            fingerprint = [dist.name if dist else None,
+                           dist.version if dist else None,
+                           self._stat_fingerprint(origin)]
+            fingerprints[self._candidate_key(candidate)] = fingerprint
+        return fingerprints
+
+    def _candidate_source(self, key):
+        origin = self._module_origin(self._candidate_from_key(key).module)
+        if origin is None or not origin.endswith(".py"):
+            return None
+        return _read_source(origin)
+
+    def _static_index_candidate(self, key):
+        source = self._candidate_source(key)
+        if source is None:
+            return None
+        # an entry point with an attribute refers to a single plugin
+        attr = self._candidate_from_key(key).attr
+        names = [attr] if attr is not None else None
+        class_name = self.plugin_class.__name__
+        return static_index_entries(source, location=key,
+                                    plugin_class_name=class_name,
+                                    filename=key, names=names)
+
+    @staticmethod
+    def _make_nsdict(candidate):
+        obj = candidate.load()
+        if candidate.attr is None:
+            return vars(obj)
+        return {candidate.attr: obj}
+
+
+# name of the table of contents in a plugin bundle, and its format version
+BUNDLE_TOC = "toc.json"
+BUNDLE_FORMAT = 1
+
+
+def bundle_bytecode_name(member):
+    """Name of the archive member with the bytecode for a source member"""
+    return "__pycache__/" + member + "c"
+
+
+class BundlePluginLoader(CLIPluginLoader):
+    """Load file plugins packed into a single bundle file
+
+    A bundle (created by :func:`plugcli.bundle.build_bundle`) is a zip
+    archive with the source of each plugin file, its compiled bytecode, and
+    a table of contents with the index entries for its command plugins. The
+    whole bundle is read in a single pass, instead of listing a directory
+    and opening each plugin file separately. The bytecode is only used if it
+    was compiled by a compatible Python version; otherwise the source is
+    compiled. The index uses the table of contents where it has entries,
+    and only falls back to ``static`` parsing or loading otherwise.
+
+    Parameters
+    ----------
+    search_path : str
+        path to the bundle file (OS-dependent format)
+    plugin_class: type
+        plugins are identified as instances of this class (override in
+        ``_is_my_plugin``)
+    kwargs :
+        options shared by all loaders, passed to :class:`.CLIPluginLoader`
+        (``max_workers``, ``static``, ``lib_version``, ``cli_version``, and
+        ``incompatible``)
+    """
+    def __init__(self, search_path, plugin_class, **kwargs):
+        super().__init__(plugin_type="bundle", search_path=search_path,
+                         plugin_class=plugin_class, **kwargs)
+        self._contents = None
+
+    def _bundle_contents(self):
+        """Table of contents and all members of the bundle (read once)"""
+        if self._contents is not None:
+            return self._contents
+
+        try:
+            with open(self.search_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._contents = ({'candidates': {}}, {})
+            return self._contents
+
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                members = {name: archive.read(name)
+                           for name in archive.namelist()}
+            toc = json.loads(members.pop(BUNDLE_TOC).decode('utf-8'))
+        except zipfile.BadZipFile as exc:
+            raise PluginRegistrationError(
+                f"Corrupt plugin bundle '{self.search_path}': {exc}"
+            ) from exc
+        except KeyError:
+            raise PluginRegistrationError(
+                f"Plugin bundle '{self.search_path}' has no {BUNDLE_TOC}"
+            ) from None
+        except ValueError as exc:  # includes JSON and Unicode errors
+            raise PluginRegistrationError(
+                f"Invalid {BUNDLE_TOC} in plugin bundle "
+                f"'{self.search_path}': {exc}"
+            ) from exc
+
+        if not isinstance(toc, dict) or toc.get('format') != BUNDLE_FORMAT:
+            raise PluginRegistrationError(
+                f"Unsupported plugin bundle format in '{self.search_path}'"
+            )
+        self._contents = (toc, members)
+        return self._contents
+
+    def _member(self, key):
+        return os.path.basename(key)
+
+    def _find_candidates(self):
+        toc, _ = self._bundle_contents()
+        return [os.path.join(os.fspath(self.search_path), member)
+                for member in toc['candidates']]
+
+    def _candidate_fingerprints(self):
+        # every candidate changes when the bundle does
+        fingerprint = self._stat_fingerprint(self.search_path)
+        return {self._candidate_key(cand): fingerprint
+                for cand in self._find_candidates()}
+
+    def _candidate_source(self, key):
+        _, members = self._bundle_contents()
+        try:
+            return members[self._member(key)].decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+
+    def _index_candidate(self, key):
+        toc, _ = self._bundle_contents()
+        entries = toc['candidates'][self._member(key)]['entries']
+        if entries is None:
+            return super()._index_candidate(key)
+        # JSON stores versions as lists; match the entries from loading
+        def from_json(version):
+            return tuple(version) if isinstance(version, list) else version
+
+        return [dict(entry, location=key,
+                     requires_lib=from_json(entry['requires_lib']),
+                     requires_cli=from_json(entry['requires_cli']))
+                for entry in entries]
+
+    def _make_nsdict(self, candidate):
+        toc, members = self._bundle_contents()
+        member = self._member(candidate)
+        bytecode = members.get(bundle_bytecode_name(member))
+        if (bytecode is not None
+                and toc.get('magic') == importlib.util.MAGIC_NUMBER.hex()):
+            code = marshal.loads(bytecode)
+        else:
+            code = compile(members[member], candidate, 'exec',
+                           dont_inherit=True)
+        ns = {}
+        eval(code, ns, ns)
+        return ns
@@ -0,0 +1,202 @@
+"""Instrumentation for plugin loading.
+
+Set the environment variable ``PLUGCLI_PROFILE`` to record, for each
+candidate module processed by a plugin loader, the time taken to load it,
+the number of modules it added to ``sys.modules``, and the change in traced
+memory. The report is written when the process exits: if the variable is
+``1``, ``-``, or ``stderr``, a table is printed to stderr; otherwise the
+value is used as a filename, and the report is written as JSON if the
+filename ends in ``.json`` (and as a table otherwise).
+
+Note that module and memory counts are process-wide, so they are only
+meaningful when candidates are loaded sequentially.
+"""
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+
+from ._instrumentation import EnvActivatedInstrument
+
+_STDERR_DESTINATIONS = {"1", "-", "stderr"}
+
+
+class StartupProfiler:
+    """Record the cost of loading each plugin candidate.
+
+    Parameters
+    ----------
+    trace_memory : bool
+        whether to use :mod:`tracemalloc` to record memory usage; this
+        slows down loading significantly. If the profiler starts
+        :mod:`tracemalloc`, it is stopped by :meth:`.stop`.
+    """
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = {}
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    def stop(self):
+        """Stop recording memory usage.
+
+        This stops :mod:`tracemalloc` if this profiler started it. Records
+        are kept, and later records have no memory usage.
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.trace_memory = False
+
+    def _traced_memory(self):
+        if not self.trace_memory:
+            return 0
+        return tracemalloc.get_traced_memory()[0]
+
+    @contextlib.contextmanager
+    def record(self, candidate, plugin_type):
+        """Context manager to record the cost of loading a candidate.
+
+        If the same candidate is recorded more than once, the costs are
+        added together.
+
+        Parameters
+        ----------
+        candidate : str
+            label for the candidate
+        plugin_type : str
+            type of the loader (e.g., "file" or "namespace")
+        """
+        n_modules = len(sys.modules)
+        memory = self._traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            record = self.records.setdefault(candidate, {
+                'candidate': candidate,
+                'plugin_type': plugin_type,
+                'time': 0.0,
+                'new_modules': 0,
+                'memory': 0,
+            })
+            record['time'] += elapsed
+            record['new_modules'] += len(sys.modules) - n_modules
+            record['memory'] += self._traced_memory() - memory
+
+    def results(self):
+        """Records for all candidates, slowest first.
+
+        Returns
+        -------
+        List[Dict[str, Any]] :
+            one dict per candidate, with keys ``candidate``,
+            ``plugin_type``, ``time`` (seconds), ``new_modules``, and
+            ``memory`` (bytes)
+        """
+        return sorted(self.records.values(), key=lambda rec: rec['time'],
+                      reverse=True)
+
+    def format_table(self):
+        """Report as a human-readable table"""
+        results = self.results()
+        width = max([len("candidate")]
+                    + [len(rec['candidate']) for rec in results])
+        header = (f"{'candidate':<{width}}  {'type':<10}  {'time (ms)':>10}"
+                  f"  {'modules':>8}  {'memory (KiB)':>12}")
+        lines = [header, "-" * len(header)]
+        for rec in results + [self._total(results)]:
+            lines.append(
+                f"{rec['candidate']:<{width}}  {rec['plugin_type']:<10}  "
+                f"{rec['time'] * 1000:>10.1f}  {rec['new_modules']:>8d}  "
+                f"{rec['memory'] / 1024:>12.1f}"
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _total(results):
+        return {
+            'candidate': "TOTAL",
+            'plugin_type': "",
+            'time': sum(rec['time'] for rec in results),
+            'new_modules': sum(rec['new_modules'] for rec in results),
+            'memory': sum(rec['memory'] for rec in results),
+        }
+
+    def to_json(self):
+        """Report as a JSON string"""
+        results = self.results()
+        return json.dumps({'candidates': results,
+                           'total': self._total(results)}, indent=2)
+
+    def emit(self, destination):
+        """Write the report.
+
+        Parameters
+        ----------
+        destination : str
+            where to write the report; see module documentation for details
+        """
+        self.stop()
+        if destination in _STDERR_DESTINATIONS:
+            sys.stderr.write(self.format_table())
+            return
+
+        if destination.endswith(".json"):
+            report = self.to_json()
+        else:
+            report = self.format_table()
+
+        with open(destination, mode='w', encoding='utf-8') as f:
+            f.write(report)
+
+
+_PROFILING = EnvActivatedInstrument("PLUGCLI_PROFILE", StartupProfiler)
+
+
+def enable_profiling(destination=None, trace_memory=True):
+    """Start profiling plugin loading.
+
+    Parameters
+    ----------
+    destination : str or None
+        if given, the report is written here when the process exits (see
+        module documentation for details)
+    trace_memory : bool
+        whether to record memory usage
+
+    Returns
+    -------
+    :class:`.StartupProfiler` :
+        the active profiler
+    """
+    return _PROFILING.enable(destination, trace_memory=trace_memory)
+
+
+def disable_profiling():
+    """Stop profiling plugin loading"""
+    _PROFILING.disable()
+
+
+def get_profiler():
+    """The active profiler, or None if profiling is not enabled.
+
+    The first call checks the ``PLUGCLI_PROFILE`` environment variable.
+    """
+    return _PROFILING.get()
+
+
+def profile_candidate(candidate, plugin_type):
+    """Context manager recording a candidate in the active profiler, if any.
+
+    Parameters
+    ----------
+    candidate : str
+        label for the candidate
+    plugin_type : str
+        type of the loader (e.g., "file" or "namespace")
+    """
+    return _PROFILING.context("record", candidate, plugin_type)
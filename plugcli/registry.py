@@ -0,0 +1,148 @@
+import collections
+
+
+def normalize_name(name):
+    """Normalize a command name (underscores become hyphens)"""
+    return name.replace('_', '-')
+
+
+def _location_key(location):
+    # namespace plugins are located by module; everything else by path/key
+    if location is None:
+        return None
+    return getattr(location, '__name__', str(location))
+
+
+class PluginRegistry:
+    """Indexed collection of command plugins.
+
+    Plugins are indexed by (normalized) name, section, location, and plugin
+    type, so that registration, deregistration, and lookups by any of these
+    are constant time. Iteration and query results follow registration
+    order.
+
+    Names are normalized so that underscores and hyphens are equivalent;
+    registering a plugin with the same normalized name as an existing
+    plugin replaces the existing plugin.
+    """
+    def __init__(self):
+        self._by_name = {}
+        self._by_section = collections.defaultdict(dict)
+        self._by_location = collections.defaultdict(dict)
+        self._by_type = collections.defaultdict(dict)
+
+    def _indices(self, plugin):
+        return [
+            self._by_section[plugin.section],
+            self._by_location[_location_key(plugin.location)],
+            self._by_type[plugin.plugin_type],
+        ]
+
+    def register(self, plugin):
+        """Add a plugin to the registry.
+
+        Parameters
+        ----------
+        plugin : :class:`.CommandPlugin`
+            plugin to register
+
+        Returns
+        -------
+        :class:`.CommandPlugin` or None :
+            the plugin that was replaced, if any
+        """
+        name = normalize_name(plugin.name)
+        replaced = self._by_name.get(name)
+        if replaced is not None:
+            self.deregister(replaced)
+
+        self._by_name[name] = plugin
+        for index in self._indices(plugin):
+            index[name] = plugin
+
+        return replaced
+
+    def deregister(self, plugin):
+        """Remove a plugin from the registry.
+
+        Parameters
+        ----------
+        plugin : :class:`.CommandPlugin` or str
+            plugin to remove, or its name
+        """
+        if isinstance(plugin, str):
+            plugin = self[plugin]
+
+        name = normalize_name(plugin.name)
+        del self._by_name[name]
+        for index in self._indices(plugin):
+            del index[name]
+
+    def get(self, name, default=None):
+        """Plugin for a given name (underscores or hyphens)"""
+        return self._by_name.get(normalize_name(name), default)
+
+    def __getitem__(self, name):
+        return self._by_name[normalize_name(name)]
+
+    def __contains__(self, name):
+        return normalize_name(name) in self._by_name
+
+    def __iter__(self):
+        return iter(list(self._by_name.values()))
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def names(self):
+        """Normalized names of all registered plugins"""
+        return list(self._by_name)
+
+    def section_names(self, section):
+        """Normalized names of the plugins in a section"""
+        return list(self._by_section.get(section, {}))
+
+    def by_section(self, section):
+        """Plugins in a given section"""
+        return list(self._by_section.get(section, {}).values())
+
+    def by_location(self, location):
+        """Plugins found at a given location (path, module, or module name)
+        """
+        return list(self._by_location.get(_location_key(location),
+                                          {}).values())
+
+    def by_type(self, plugin_type):
+        """Plugins of a given plugin type (e.g., "file" or "namespace")"""
+        return list(self._by_type.get(plugin_type, {}).values())
+
+    def query(self, section=None, location=None, plugin_type=None):
+        """Plugins matching all the given criteria.
+
+        Parameters
+        ----------
+        section : str or None
+            if given, only plugins in this section
+        location : Any
+            if given, only plugins from this location
+        plugin_type : str or None
+            if given, only plugins of this type
+
+        Returns
+        -------
+        List[:class:`.CommandPlugin`] :
+            matching plugins, in registration order
+        """
+        selected = [self._by_name]
+        if section is not None:
+            selected.append(self._by_section.get(section, {}))
+        if location is not None:
+            selected.append(self._by_location.get(_location_key(location),
+                                                  {}))
+        if plugin_type is not None:
+            selected.append(self._by_type.get(plugin_type, {}))
+
+        # iterate over the smallest index, check membership in the others
+        smallest = min(selected, key=len)
+        return [plugin for name, plugin in smallest.items()
+                if all(name in index for index in selected)]
@@ -0,0 +1,336 @@
+"""Server mode: keep a CLI resident to avoid per-invocation startup.
+
+A :class:`.CLIServer` loads the CLI (and its plugins) once, then runs
+commands sent by the thin client in :mod:`plugcli.client` over a Unix domain
+socket. For each request, the server temporarily adopts the client's
+working directory, environment, and standard streams, so commands behave as
+if they were run by the client process.
+
+POSIX only (requires Unix domain sockets and file descriptor passing).
+"""
+import contextlib
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from .client import send_message, recv_message
+
+
+class CLIServer:
+    """Serve commands of a CLI over a Unix domain socket.
+
+    Requests are handled one at a time, in the server process.
+
+    Parameters
+    ----------
+    cli : :class:`.CLI`
+        the CLI instance to run commands with
+    socket_path : str
+        path for the Unix domain socket; the socket is only accessible by
+        the current user
+    preload : bool
+        if True, load the commands of all registered plugins when the server
+        starts (instead of when first used)
+    """
+    def __init__(self, cli, socket_path, preload=False):
+        self.cli = cli
+        self.socket_path = socket_path
+        self.preload = preload
+        self._listener = None
+
+    def preload_commands(self):
+        """Load all commands (imports lazily-loaded plugins)"""
+        for plugin in self.cli.registry:
+            plugin.command
+
+    def bind(self):
+        """Create the listening socket"""
+        if os.path.exists(self.socket_path):
+            # remove stale socket (after checking that nobody is listening)
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.remove(self.socket_path)
+            else:
+                raise RuntimeError("A server is already running at "
+                                   f"{self.socket_path}")
+            finally:
+                probe.close()
+
+        # bind to a temporary path and move it into place once listening,
+        # so that clients never find a socket that refuses connections
+        tmp_path = self.socket_path + ".tmp"
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)  # socket is only usable by this user
+        try:
+            listener.bind(tmp_path)
+        finally:
+            os.umask(old_umask)
+        listener.listen()
+        os.replace(tmp_path, self.socket_path)
+        self._listener = listener
+        return listener
+
+    def close(self):
+        """Close the listening socket and remove the socket file"""
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.socket_path)
+
+    @staticmethod
+    def _open_std_streams():
+        """New stdio objects over descriptors 0-2, like the originals"""
+        streams = []
+        for fd, (stream, mode) in enumerate([(sys.__stdin__, 'r'),
+                                             (sys.__stdout__, 'w'),
+                                             (sys.__stderr__, 'w')]):
+            streams.append(open(
+                fd, mode, buffering=1 if fd == 2 else -1, closefd=False,
+                encoding=getattr(stream, 'encoding', None),
+                errors=getattr(stream, 'errors', None),
+            ))
+        return streams
+
+    @contextlib.contextmanager
+    def _client_process_state(self, request, fds):
+        """Temporarily adopt the client's cwd, environment, and stdio"""
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        saved_fds = [os.dup(fd) for fd in range(len(fds))]
+        saved_streams = (sys.stdin, sys.stdout, sys.stderr)
+        saved_env = dict(os.environ)
+        saved_cwd = os.getcwd()
+        streams = []
+        try:
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            # fresh stream objects, so that nothing buffered for one
+            # request (e.g., unread input) is seen by the next
+            streams = self._open_std_streams()
+            sys.stdin, sys.stdout, sys.stderr = streams
+            os.environ.clear()
+            os.environ.update(request['env'])
+            os.chdir(request['cwd'])
+            yield
+        finally:
+            for stream in streams:
+                with contextlib.suppress(Exception):
+                    stream.close()  # flushes output; drops unread input
+            sys.stdin, sys.stdout, sys.stderr = saved_streams
+            for target, fd in enumerate(saved_fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+            os.chdir(saved_cwd)
+
+    def run_command(self, argv):
+        """Run a command line with the CLI, returning the exit code"""
+        prog_name = os.path.basename(argv[0]) if argv else None
+        return self.cli.run_args(argv[1:], prog_name=prog_name)
+
+    @staticmethod
+    def _request_error(request, fds):
+        """Why a request can't be run (or None), checked before running it
+        """
+        if not isinstance(request, dict):
+            return "Malformed request"
+        argv = request.get('argv')
+        if (not isinstance(argv, list)
+                or not all(isinstance(arg, str) for arg in argv)):
+            return "Malformed request: bad argv"
+        env = request.get('env')
+        if (not isinstance(env, dict)
+                or not all(isinstance(key, str) and isinstance(value, str)
+                           for key, value in env.items())):
+            return "Malformed request: bad environment"
+        cwd = request.get('cwd')
+        if not isinstance(cwd, str) or not os.path.isdir(cwd):
+            return f"Working directory does not exist: {cwd}"
+        if len(fds) != 3:
+            return "Expected 3 file descriptors (stdin, stdout, stderr)"
+        for fd in fds:
+            try:
+                os.fstat(fd)
+            except OSError:
+                return f"Invalid file descriptor: {fd}"
+        return None
+
+    def handle(self, conn):
+        """Handle a single request on a connection from the client"""
+        try:
+            request, fds = recv_message(conn, max_fds=3)
+            try:
+                error = self._request_error(request, fds)
+                if error is None:
+                    try:
+                        with self._client_process_state(request, fds):
+                            exit_code = self.run_command(request['argv'])
+                    except OSError as exc:
+                        error = f"Unable to run command: {exc}"
+            finally:
+                for fd in fds:
+                    os.close(fd)
+
+            if error is not None:
+                send_message(conn, {'exit_code': 1, 'error': error})
+            else:
+                send_message(conn, {'exit_code': exit_code})
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        """Handle requests until the process is interrupted"""
+        if self.preload:
+            self.preload_commands()
+
+        listener = self.bind()
+        try:
+            while True:
+                conn, _ = listener.accept()
+                try:
+                    self.handle(conn)
+                except (OSError, ValueError, KeyError):
+                    continue  # bad request; keep serving
+        finally:
+            self.close()
+
+
+class ZygoteServer(CLIServer):
+    """Serve commands concurrently from a pool of pre-forked workers.
+
+    The parent (zygote) process loads the CLI and all of its plugins once,
+    then forks worker processes, which share the imported modules
+    copy-on-write. Each worker handles requests from the shared socket, and
+    exits after ``max_requests`` requests; the parent replaces workers as
+    they exit, which bounds memory growth and keeps requests isolated.
+
+    Parameters
+    ----------
+    cli : :class:`.CLI`
+        the CLI instance to run commands with
+    socket_path : str
+        path for the Unix domain socket; the socket is only accessible by
+        the current user
+    workers : int
+        number of worker processes; default is the number of CPUs
+    max_requests : int or None
+        number of requests each worker handles before it is replaced;
+        default (1) gives each request a fresh worker. None means workers
+        are never recycled.
+    preload : bool
+        if True (default), load the commands of all registered plugins in
+        the parent, so that workers don't need to import them
+
+    If workers keep failing (e.g., because of an error in the CLI), they
+    are replaced after a delay that doubles with each consecutive failure,
+    up to ``MAX_RESTART_DELAY`` seconds.
+    """
+    MIN_RESTART_DELAY = 0.1
+    MAX_RESTART_DELAY = 10.0
+
+    def __init__(self, cli, socket_path, workers=None, max_requests=1,
+                 preload=True):
+        super().__init__(cli, socket_path, preload=preload)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.max_requests = max_requests
+        self._worker_pids = set()
+        self._restart_delay = 0.0
+
+    def _worker_loop(self, listener):
+        n_requests = 0
+        while self.max_requests is None or n_requests < self.max_requests:
+            conn, _ = listener.accept()
+            n_requests += 1
+            try:
+                self.handle(conn)
+            except (OSError, ValueError, KeyError):
+                continue  # bad request; keep serving
+
+    def _spawn_worker(self, listener):
+        # block termination signals until both processes are ready for them:
+        # the child must have default handlers (a signal caught by the
+        # parent's Python handler would be lost after the reset), and the
+        # parent must know the child's pid so that it can stop it
+        signals = {signal.SIGTERM, signal.SIGINT}
+        signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+        try:
+            pid = os.fork()
+            if pid == 0:  # -no-cov- (runs in the child process)
+                exit_code = 0
+                try:
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    signal.signal(signal.SIGINT, signal.SIG_DFL)
+                    signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+                    self._worker_loop(listener)
+                except BaseException:
+                    traceback.print_exc()
+                    exit_code = 1
+                finally:
+                    # never return into the parent's code
+                    os._exit(exit_code)
+
+            self._worker_pids.add(pid)
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+        return pid
+
+    def _restart_delay_after(self, status):
+        """Delay before replacing a worker that exited with ``status``"""
+        if os.waitstatus_to_exitcode(status) == 0:
+            self._restart_delay = 0.0
+        else:
+            self._restart_delay = min(
+                max(2 * self._restart_delay, self.MIN_RESTART_DELAY),
+                self.MAX_RESTART_DELAY
+            )
+        return self._restart_delay
+
+    def _stop_workers(self):
+        for pid in self._worker_pids:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+        for pid in self._worker_pids:
+            with contextlib.suppress(ChildProcessError):
+                os.waitpid(pid, 0)
+        self._worker_pids.clear()
+
+    def serve_forever(self):
+        """Run the worker pool until the process is terminated"""
+        def terminate(signum, frame):
+            raise SystemExit(0)
+
+        if self.preload:
+            self.preload_commands()
+
+        listener = self.bind()
+        old_handler = signal.signal(signal.SIGTERM, terminate)
+        try:
+            for _ in range(self.workers):
+                self._spawn_worker(listener)
+
+            while True:
+                pid, status = os.wait()
+                if pid in self._worker_pids:
+                    self._worker_pids.remove(pid)
+                    # back off instead of respawning failing workers in a
+                    # tight loop
+                    delay = self._restart_delay_after(status)
+                    if delay:
+                        time.sleep(delay)
+                    self._spawn_worker(listener)
+        finally:
+            signal.signal(signal.SIGTERM, old_handler)
+            self._stop_workers()
+            self.close()
@@ -0,0 +1,179 @@
+"""Find command plugins by parsing source code, without executing it.
+
+This handles the common pattern for command plugins::
+
+    @click.command("name", short_help="...")
+    def name(...):
+        ...
+
+    PLUGIN = CommandPlugin(
+        command=name,
+        section="Section",
+        requires_lib=(1, 0),
+        requires_cli=(1, 0),
+    )
+
+If the metadata for any plugin in a module can't be determined statically
+(e.g., the section is computed, or the command name is not given
+explicitly), the module's plugins are not extracted statically, and loaders
+fall back to executing the module.
+"""
+import ast
+
+
+class _NotStatic(Exception):
+    """Raised when metadata can't be determined from the source"""
+
+
+def _call_name(func):
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError,
+            RecursionError):
+        raise _NotStatic()
+
+
+def _command_metadata(func_def):
+    """Name and short help of a command defined by a decorated function"""
+    for decorator in func_def.decorator_list:
+        is_command = (isinstance(decorator, ast.Call)
+                      and _call_name(decorator.func) in ("command", "group"))
+        if not is_command:
+            continue
+
+        kwargs = {kw.arg: kw.value for kw in decorator.keywords}
+        if decorator.args:
+            name = _literal(decorator.args[0])
+        elif 'name' in kwargs:
+            name = _literal(kwargs['name'])
+        else:
+            # default name depends on click version; don't guess
+            raise _NotStatic()
+
+        short_help = None
+        if 'short_help' in kwargs:
+            short_help = _literal(kwargs['short_help'])
+
+        if not isinstance(name, str):
+            raise _NotStatic()
+        return name, short_help
+
+    raise _NotStatic()
+
+
+def _plugin_entry(call, functions, location):
+    if any(kw.arg is None for kw in call.keywords):
+        raise _NotStatic()  # **kwargs
+    if any(isinstance(arg, ast.Starred) for arg in call.args):
+        raise _NotStatic()  # *args
+
+    arg_names = ['command', 'section', 'short_help']
+    if len(call.args) > len(arg_names):
+        raise _NotStatic()
+    args = dict(zip(arg_names, call.args))
+    args.update({kw.arg: kw.value for kw in call.keywords})
+
+    required = ['command', 'section', 'requires_lib', 'requires_cli']
+    if not all(key in args for key in required):
+        raise _NotStatic()
+
+    command = args['command']
+    if not isinstance(command, ast.Name) or command.id not in functions:
+        raise _NotStatic()
+    name, short_help = _command_metadata(functions[command.id])
+
+    if 'short_help' in args:
+        plugin_short_help = _literal(args['short_help'])
+        if plugin_short_help is not None:
+            short_help = plugin_short_help
+
+    section = _literal(args['section'])
+    if not isinstance(section, str):
+        raise _NotStatic()
+
+    def version(node):
+        value = _literal(node)
+        if value is not None and not isinstance(value, tuple):
+            raise _NotStatic()
+        return value
+
+    return {
+        'name': name,
+        'section': section,
+        'short_help': short_help,
+        'location': location,
+        'requires_lib': version(args['requires_lib']),
+        'requires_cli': version(args['requires_cli']),
+    }
+
+
+def _assigned_names(node):
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    return {target.id for target in targets if isinstance(target, ast.Name)}
+
+
+def static_index_entries(source, location, plugin_class_name="CommandPlugin",
+                         filename="<unknown>", names=None):
+    """Index entries for the command plugins in a module's source code.
+
+    Parameters
+    ----------
+    source : str
+        source code of the module
+    location : str
+        candidate key for the module (used as the ``location`` of entries)
+    plugin_class_name : str
+        name of the plugin class whose instances are plugins
+    filename : str
+        filename, used in error messages
+    names : Iterable[str] or None
+        if given, only plugins assigned to these module-level names are
+        included
+
+    Returns
+    -------
+    List[Dict[str, Any]] or None :
+        index entries (as in :meth:`.CLIPluginLoader.index`), or None if
+        the plugins can't be determined statically
+    """
+    try:
+        tree = ast.parse(source, filename)
+    except (SyntaxError, ValueError):
+        return None
+
+    functions = {node.name: node for node in tree.body
+                 if isinstance(node, (ast.FunctionDef,
+                                      ast.AsyncFunctionDef))}
+
+    plugin_calls = [node for node in ast.walk(tree)
+                    if isinstance(node, ast.Call)
+                    and _call_name(node.func) == plugin_class_name]
+    # only plugins assigned at module level are found when executing
+    assignments = [node for node in tree.body
+                   if isinstance(node, (ast.Assign, ast.AnnAssign))
+                   and isinstance(node.value, ast.Call)
+                   and _call_name(node.value.func) == plugin_class_name]
+
+    if not plugin_calls or len(plugin_calls) != len(assignments):
+        return None
+
+    if names is not None:
+        names = set(names)
+        assignments = [node for node in assignments
+                       if names & _assigned_names(node)]
+        if not assignments:
+            return None
+
+    try:
+        return [_plugin_entry(node.value, functions, location)
+                for node in assignments]
+    except _NotStatic:
+        return None
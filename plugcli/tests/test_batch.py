@@ -0,0 +1,102 @@
+import pytest
+from unittest.mock import MagicMock
+
+import click
+from click.testing import CliRunner
+
+from plugcli.batch import *
+from plugcli.cli import CLI
+from plugcli.params import Option, MultiStrategyGetter
+
+
+class BatchCLI(CLI):
+    COMMAND_SECTIONS = ["Simulation", "Miscellaneous"]
+
+    def get_installed_plugins(self):
+        self.strategy = MagicMock(
+            side_effect=lambda user_input, context: user_input.upper()
+        )
+        name_option = Option("--name", getter=MultiStrategyGetter(
+            [self.strategy], "bad name", cache_size=10
+        ))
+
+        @click.command("greet")
+        @name_option.parameter()
+        def greet(name):
+            click.echo(f"hello {name_option.get(name)}")
+
+        @click.command("fail")
+        @click.argument("code", type=int)
+        def fail(code):
+            raise SystemExit(code)
+
+        return [
+            CommandPlugin(command=cmd, section="Simulation",
+                          requires_lib=None, requires_cli=None)
+            for cmd in [greet, fail]
+        ] + [batch_plugin("Miscellaneous")]
+
+
+SCRIPT = """
+# comment
+greet --name foo
+fail 3
+greet --name "bar baz"
+greet --name foo
+"""
+
+
+class TestBatch:
+    def setup_method(self):
+        self.cli = BatchCLI()
+
+    def test_run_batch(self):
+        results = self.cli.run_batch(SCRIPT.splitlines(),
+                                     continue_on_error=True)
+        assert results == [
+            (3, "greet --name foo", 0),
+            (4, "fail 3", 3),
+            (5, 'greet --name "bar baz"', 0),
+            (6, "greet --name foo", 0),
+        ]
+        # getter cache reused between lines
+        assert self.cli.strategy.call_count == 2
+
+    def test_run_batch_stop_on_error(self):
+        results = self.cli.run_batch(SCRIPT.splitlines())
+        assert [code for _, _, code in results] == [0, 3]
+
+    def test_run_batch_parse_error(self, capsys):
+        results = self.cli.run_batch(['greet --name "foo'])
+        assert results == [(1, 'greet --name "foo', 2)]
+        assert "Error parsing line 1" in capsys.readouterr().err
+
+    def test_batch_command(self):
+        runner = CliRunner()
+        result = runner.invoke(self.cli, ["batch"], input=SCRIPT)
+        assert result.exit_code == 3
+        assert result.stdout == "hello FOO\n"
+        assert "Line 4 failed with exit code 3: fail 3" in result.stderr
+        assert "1 of 2 commands failed" in result.stderr
+
+    def test_batch_command_continue(self, tmp_path):
+        script = tmp_path / "script.txt"
+        script.write_text(SCRIPT)
+        runner = CliRunner()
+        result = runner.invoke(self.cli, ["batch", "--continue-on-error",
+                                          str(script)])
+        assert result.exit_code == 3
+        assert result.stdout.splitlines() == ["hello FOO", "hello BAR BAZ",
+                                              "hello FOO"]
+        assert "1 of 4 commands failed" in result.stderr
+
+    def test_batch_command_success(self):
+        runner = CliRunner()
+        result = runner.invoke(self.cli, ["batch"], input="greet --name x\n")
+        assert result.exit_code == 0
+        assert result.stdout == "hello X\n"
+
+    def test_in_help(self):
+        result = CliRunner().invoke(self.cli, ["--help"])
+        assert "Miscellaneous Commands" in result.output
+        assert "batch" in result.output
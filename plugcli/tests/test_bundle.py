@@ -0,0 +1,88 @@
+import pytest
+
+import json
+import zipfile
+
+import click
+from click.testing import CliRunner
+
+from plugcli.bundle import *
+from plugcli.cli import CLI
+from plugcli.plugin_management import BundlePluginLoader, FilePluginLoader
+
+PLUGIN_FILE = """
+import click
+from plugcli.plugin_management import CommandPlugin
+
+@click.command("hello", short_help="Say hello")
+def hello():
+    click.echo("hello from bundle")
+
+PLUGIN = CommandPlugin(command=hello, section="Misc",
+                       requires_lib=None, requires_cli=None)
+"""
+
+
+@pytest.fixture
+def plugin_dir(tmp_path):
+    plugin_dir = tmp_path / "plugins"
+    plugin_dir.mkdir()
+    (plugin_dir / "hello.py").write_text(PLUGIN_FILE)
+    (plugin_dir / "_private.py").write_text("raise RuntimeError()\n")
+    (plugin_dir / "notes.txt").write_text("not a plugin\n")
+    return plugin_dir
+
+
+class BundleCLI(CLI):
+    COMMAND_SECTIONS = ["Misc"]
+
+    def __init__(self, bundle):
+        self.bundle = bundle
+        super().__init__()
+
+    def get_installed_plugins(self):
+        loader = BundlePluginLoader(self.bundle, CommandPlugin)
+        return loader.lazy_plugins(loader.index()) + [bundle_plugin("Misc")]
+
+
+def test_build_bundle(plugin_dir, tmp_path):
+    bundle = tmp_path / "plugins.zip"
+    assert build_bundle(plugin_dir, bundle) == 1
+    with zipfile.ZipFile(bundle) as archive:
+        names = set(archive.namelist())
+        toc = json.loads(archive.read("toc.json"))
+    assert names == {"toc.json", "hello.py", "__pycache__/hello.pyc"}
+    assert toc['candidates'] == {'hello.py': {'entries': [{
+        'name': "hello", 'section': "Misc", 'short_help': "Say hello",
+        'location': "hello.py", 'requires_lib': None, 'requires_cli': None,
+    }]}}
+
+
+def test_build_bundle_matches_file_loader(plugin_dir, tmp_path):
+    bundle = tmp_path / "plugins.zip"
+    build_bundle(plugin_dir, bundle)
+    file_loader = FilePluginLoader(plugin_dir, CommandPlugin)
+    bundle_loader = BundlePluginLoader(bundle, CommandPlugin)
+    expected = [(p.name, p.section) for p in file_loader()]
+    assert [(p.name, p.section) for p in bundle_loader()] == expected
+
+
+def test_bundled_cli(plugin_dir, tmp_path):
+    bundle = tmp_path / "plugins.zip"
+    build_bundle(plugin_dir, bundle)
+    cli = BundleCLI(bundle)
+    result = CliRunner().invoke(cli, ["hello"])
+    assert result.exit_code == 0
+    assert result.output == "hello from bundle\n"
+
+
+def test_bundle_plugins_command(plugin_dir, tmp_path):
+    bundle = tmp_path / "plugins.zip"
+    build_bundle(plugin_dir, bundle)
+    cli = BundleCLI(bundle)
+    new_bundle = tmp_path / "new.zip"
+    result = CliRunner().invoke(cli, ["bundle-plugins", str(plugin_dir),
+                                      str(new_bundle)])
+    assert result.exit_code == 0
+    assert f"Bundled 1 plugin files into {new_bundle}" in result.output
+    assert new_bundle.exists()
@@ -1,10 +1,11 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from click.testing import CliRunner
+from click.shell_completion import ShellComplete
 
 from plugcli.cli import *
 
-from plugcli.plugin_management import CommandPlugin
+from plugcli.plugin_management import CommandPlugin, LazyCommandPlugin
 
 class FakeCLI(CLI):
     COMMAND_SECTIONS = ["Simulation", "Analysis", "Miscellaneous"]
@@ -85,13 +86,33 @@ class TestCLI(object):
 
     def test_plugins(self):
         assert self.cli.plugins == self.plugins
-        assert self.cli._sections['Simulation'] == ['foo']
-        assert self.cli._sections['Miscellaneous'] == ['foo-bar', 'baz-qux']
+        registry = self.cli.registry
+        assert registry.section_names('Simulation') == ['foo']
+        assert registry.section_names('Miscellaneous') == ['foo-bar',
+                                                          'baz-qux']
 
     @pytest.mark.parametrize('name', ['foo', 'foo-bar'])
     def test_plugin_for_command(self, name):
         assert self.cli.plugin_for_command(name) == self.plugin_dict[name]
 
+    def test_register_duplicate_warns(self):
+        duplicate = CommandPlugin(
+            command=self.plugin_dict['foo'].command,
+            section="Analysis",
+            requires_lib=(1, 0, 0),
+            requires_cli=(2, 0, 0),
+        )
+        duplicate.attach_metadata(location="other/foo.py", plugin_type='file')
+        with pytest.warns(UserWarning, match="'foo' from other/foo.py "
+                          "replaces the command from foo.py"):
+            self.cli._register_plugin(duplicate)
+        assert self.cli.plugin_for_command('foo') is duplicate
+
+    def test_deregister_underscored(self):
+        self.cli._deregister_plugin(self.plugin_dict['baz-qux'])
+        assert 'baz-qux' not in self.cli.list_commands(ctx=None)
+        assert self.cli.registry.section_names('Miscellaneous') == ['foo-bar']
+
     def test_list_commands(self):
         expected = list(self.plugin_dict)
         assert self.cli.list_commands(ctx=None) == expected
@@ -109,9 +130,14 @@ class TestCLI(object):
 
     def test_format_commands(self):
         formatter = MockFormatter()
-        # add a non-existent command; tests when get_command is None
-        self.cli._sections['Workflow'] = ['baz']
-        self.cli.format_commands(ctx=None, formatter=formatter)
+        # add a non-existent command; tests when the registry doesn't have it
+        def sort_commands(section, commands):
+            yield from commands
+            yield 'baz'
+
+        with patch.object(self.cli, '_section_sort_commands',
+                          side_effect=sort_commands):
+            self.cli.format_commands(ctx=None, formatter=formatter)
         foo_row = ('foo', 'foo help')
         foobar_row = ('foo-bar', '')
         bazqux_row = ('baz-qux', '')
@@ -120,6 +146,113 @@ class TestCLI(object):
                                                                 bazqux_row]
         assert len(formatter.contents) == 2
 
+    def test_lazy_plugin(self):
+        real_plugin = self.plugin_dict['foo']
+        loader = MagicMock(plugin_type='file')
+        loader.load_plugin = MagicMock(return_value=real_plugin)
+        lazy = LazyCommandPlugin(name='lazy_foo', section="Simulation",
+                                 location="foo.py", loader=loader,
+                                 short_help="foo help")
+        self.cli._register_plugin(lazy)
+        assert 'lazy-foo' in self.cli.list_commands(ctx=None)
+        assert self.cli.registry.section_names('Simulation') == ['foo',
+                                                                'lazy-foo']
+        assert not loader.load_plugin.called
+        cmd = self.cli.get_command(ctx=None, name='lazy_foo')
+        loader.load_plugin.assert_called_once_with("foo.py", 'lazy_foo')
+        assert cmd() == 'foo'
+
+    def _register_lazy(self, name, command=None):
+        if command is None:
+            command = click.Command(name, params=[click.Option(['--bar'])])
+        real_plugin = CommandPlugin(command=command, section="Simulation",
+                                    requires_lib=(1, 0, 0),
+                                    requires_cli=(2, 0, 0))
+        loader = MagicMock(plugin_type='file')
+        loader.load_plugin = MagicMock(return_value=real_plugin)
+        lazy = LazyCommandPlugin(name=name, section="Simulation",
+                                 location=name + ".py", loader=loader,
+                                 short_help=name + " help")
+        self.cli._register_plugin(lazy)
+        return loader
+
+    @pytest.mark.parametrize('incomplete, expected', [
+        ('', ['foo', 'foo-bar', 'baz-qux', 'lazy-a', 'lazy-b']),
+        ('fo', ['foo', 'foo-bar']),
+        ('lazy', ['lazy-a', 'lazy-b']),
+    ])
+    def test_shell_complete_commands(self, incomplete, expected):
+        loaders = [self._register_lazy(name) for name in ['lazy-a',
+                                                           'lazy-b']]
+        comp = ShellComplete(self.cli, {}, 'fake', '_FAKE_COMPLETE')
+        completions = comp.get_completions([], incomplete)
+        assert [c.value for c in completions] == expected
+        helps = {c.value: c.help for c in completions}
+        if 'lazy-a' in helps:
+            assert helps['lazy-a'] == "lazy-a help"
+        assert all(not loader.load_plugin.called for loader in loaders)
+
+    def test_shell_complete_subcommand_options(self):
+        loader_a = self._register_lazy('lazy-a')
+        loader_b = self._register_lazy('lazy-b')
+        comp = ShellComplete(self.cli, {}, 'fake', '_FAKE_COMPLETE')
+        completions = comp.get_completions(['lazy-a'], '--b')
+        assert [c.value for c in completions] == ['--bar']
+        assert loader_a.load_plugin.called
+        assert not loader_b.load_plugin.called
+
+    def test_help_does_not_load_plugins(self):
+        loader = self._register_lazy('lazy-a')
+        result = CliRunner().invoke(self.cli, ['--help'])
+        assert result.exit_code == 0
+        assert "lazy-a help" in result.output
+        assert "foo help" in result.output
+        assert not loader.load_plugin.called
+
+    def test_format_commands_cached(self):
+        ctx = click.Context(self.cli)
+        formatter = click.HelpFormatter(width=80)
+        self.cli.format_commands(ctx, formatter)
+        expected = formatter.getvalue()
+        assert "Simulation Commands" in expected
+
+        with patch.object(self.cli, '_format_command_sections') as fmt:
+            formatter = click.HelpFormatter(width=80)
+            self.cli.format_commands(ctx, formatter)
+            assert formatter.getvalue() == expected
+            assert not fmt.called
+            # different width gets rendered
+            self.cli.format_commands(ctx, click.HelpFormatter(width=60))
+            assert fmt.call_count == 1
+
+    def test_help_output(self):
+        expected = "\n".join([
+            "Usage: root [OPTIONS] COMMAND [ARGS]...",
+            "",
+            "Options:",
+            "  --help  Show this message and exit.",
+            "",
+            "Simulation Commands:",
+            "  foo  foo help",
+            "",
+            "Miscellaneous Commands:",
+            "  foo-bar",
+            "  baz-qux",
+            "",
+        ])
+        # same output when rendered and when cached
+        for _ in range(2):
+            result = CliRunner().invoke(self.cli, ["--help"])
+            assert result.output == expected
+
+    def test_format_commands_cache_invalidated(self):
+        ctx = click.Context(self.cli)
+        self.cli.format_commands(ctx, click.HelpFormatter(width=80))
+        self._register_lazy('lazy-a')
+        formatter = click.HelpFormatter(width=80)
+        self.cli.format_commands(ctx, formatter)
+        assert "lazy-a help" in formatter.getvalue()
+
     def test_section_sort_commands(self):
         cli = FakeCLIResorted()
         # deal with the fact that baz-qux isn't registered
@@ -0,0 +1,119 @@
+import pytest
+from unittest.mock import patch
+
+import os
+import pathlib
+import shutil
+
+from plugcli.discovery_cache import *
+from plugcli.plugin_management import (
+    FilePluginLoader, NamespacePluginLoader, CommandPlugin,
+    LazyCommandPlugin
+)
+
+EXAMPLES = pathlib.Path(__file__).resolve().parent / "plugin_examples"
+
+
+def test_user_cache_dir_env(tmp_path):
+    with patch.dict(os.environ, {"PLUGCLI_CACHE_DIR": str(tmp_path)}):
+        assert user_cache_dir() == str(tmp_path)
+
+
+class TestDiscoveryCache:
+    @pytest.fixture(autouse=True)
+    def _dirs(self, tmp_path):
+        self.plugin_dir = tmp_path / "plugins"
+        self.plugin_dir.mkdir()
+        for name in ['exampleA', 'exampleB']:
+            shutil.copy(EXAMPLES / (name + ".py"), self.plugin_dir)
+        self.cache = DiscoveryCache(tmp_path / "cache")
+
+    def _loader(self):
+        return FilePluginLoader(self.plugin_dir, CommandPlugin)
+
+    def _spy_index(self, loader):
+        return patch.object(loader, '_index_candidate',
+                            wraps=loader._index_candidate)
+
+    def test_cold_start(self):
+        loader = self._loader()
+        with self._spy_index(loader) as spy:
+            index = self.cache.index(loader)
+        assert spy.call_count == 2
+        assert {e['name'] for e in index} == {'exampleA', 'exampleB'}
+        assert os.path.exists(self.cache._cache_file(loader))
+
+    def test_warm_start(self):
+        self.cache.index(self._loader())
+        loader = self._loader()
+        with self._spy_index(loader) as spy:
+            plugins = self.cache.lazy_plugins(loader)
+        assert spy.call_count == 0
+        assert loader._loaded_candidates == {}
+        assert all(isinstance(p, LazyCommandPlugin) for p in plugins)
+        sections = {p.name: p.section for p in plugins}
+        assert sections == {'exampleA': "Simulation",
+                            'exampleB': "Miscellaneous"}
+
+    def test_changed_candidate(self):
+        self.cache.index(self._loader())
+        changed = self.plugin_dir / "exampleA.py"
+        changed.write_text(changed.read_text().replace("Simulation",
+                                                       "Analysis"))
+        loader = self._loader()
+        with self._spy_index(loader) as spy:
+            index = self.cache.index(loader)
+        spy.assert_called_once_with(str(changed))
+        sections = {e['name']: e['section'] for e in index}
+        assert sections['exampleA'] == "Analysis"
+
+    def test_removed_and_added_candidate(self):
+        self.cache.index(self._loader())
+        os.remove(self.plugin_dir / "exampleA.py")
+        index = self.cache.index(self._loader())
+        assert [e['name'] for e in index] == ['exampleB']
+        assert list(self.cache.load(self._loader())) == [
+            str(self.plugin_dir / "exampleB.py")
+        ]
+
+    def test_corrupt_cache(self):
+        loader = self._loader()
+        os.makedirs(self.cache.directory)
+        with open(self.cache._cache_file(loader), 'w') as f:
+            f.write("{not json")
+        assert self.cache.load(loader) == {}
+        index = self.cache.index(loader)
+        assert len(index) == 2
+        assert len(self.cache.load(loader)) == 2
+
+    def test_different_loaders(self):
+        file_loader = self._loader()
+        ns_loader = NamespacePluginLoader("plugcli.tests.plugin_examples",
+                                          CommandPlugin)
+        assert (self.cache._cache_file(file_loader)
+                != self.cache._cache_file(ns_loader))
+
+    def test_multiple_search_paths(self, tmp_path):
+        other = tmp_path / "other"
+        other.mkdir()
+        loader = FilePluginLoader([self.plugin_dir, other], CommandPlugin)
+        assert (self.cache._cache_file(loader)
+                != self.cache._cache_file(self._loader()))
+        index = self.cache.index(loader)
+        assert {e['name'] for e in index} == {'exampleA', 'exampleB'}
+
+    def test_clear(self):
+        loader = self._loader()
+        self.cache.index(loader)
+        self.cache.clear(loader)
+        assert self.cache.load(loader) == {}
+        self.cache.clear(loader)  # no error if already cleared
+
+    def test_namespace_warm_start(self):
+        namespace = "plugcli.tests.plugin_examples"
+        self.cache.index(NamespacePluginLoader(namespace, CommandPlugin))
+        loader = NamespacePluginLoader(namespace, CommandPlugin)
+        with self._spy_index(loader) as spy:
+            plugins = self.cache.lazy_plugins(loader)
+        assert spy.call_count == 0
+        assert {p.name for p in plugins} == {'exampleA', 'exampleB'}
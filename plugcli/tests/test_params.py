@@ -1,4 +1,8 @@
 import pytest
+import asyncio
+import os
+import time
+from unittest.mock import MagicMock, patch
 
 from plugcli.params import *
 
@@ -31,6 +35,52 @@ class ParameterTest:
         )
         assert param.get(3) == 3
 
+    def test_get_many(self):
+        assert self.param.get_many([1, 2], {}) == [2, 3]
+
+    def test_get_many_batch_getter(self):
+        getter = MultiStrategyGetter(
+            [BatchStrategy(lambda inputs, context: [i * 10 for i in inputs])],
+            error_message="{user_input}"
+        )
+        param = self.plugcli_class(self.name, getter=getter)
+        with patch.object(getter, 'get_many',
+                          wraps=getter.get_many) as get_many:
+            assert param.get_many((1, 2)) == [10, 20]
+        get_many.assert_called_once_with([1, 2], None)
+
+    def test_get_many_async_getter(self):
+        async def getter(user_input, context):
+            return user_input * 2
+
+        param = self.plugcli_class(self.name, getter=getter)
+        assert param.get_many([1, 2]) == [2, 4]
+
+    def test_get_async_getter(self):
+        async def getter(user_input, context):
+            return user_input * 2
+
+        param = self.plugcli_class(self.name, getter=getter)
+        assert param.get(3) == 6
+        assert asyncio.run(param.get_async(3)) == 6
+
+    def test_get_async_getter_returns_awaitable(self):
+        async def double(user_input):
+            return user_input * 2
+
+        async def double_many(user_inputs, context):
+            return [user_input * 2 for user_input in user_inputs]
+
+        getters = [lambda user_input, context: double(user_input),
+                   BatchStrategy(double_many)]
+        for getter in getters:
+            param = self.plugcli_class(self.name, getter=getter)
+            assert asyncio.run(param.get_async(3)) == 6
+            assert resolve_parameters({'x': (param, 3)}) == {'x': 6}
+
+    def test_get_async_sync_getter(self):
+        assert asyncio.run(self.param.get_async(1, {})) == 2
+
     @pytest.mark.parametrize('override', [
         {},
         {'required': False}
@@ -61,6 +111,181 @@ class TestArgument(ParameterTest):
     click_class = click.Argument
 
 
+@pytest.mark.parametrize('is_async', [True, False])
+def test_resolve_parameters_concurrent(is_async):
+    delay = 0.2
+    if is_async:
+        async def getter(user_input, context):
+            await asyncio.sleep(delay)
+            return user_input + context['offset']
+    else:
+        def getter(user_input, context):
+            time.sleep(delay)
+            return user_input + context['offset']
+
+    requests = {f"opt{i}": (Option(f"--opt{i}", getter=getter), i)
+                for i in range(4)}
+    start = time.perf_counter()
+    results = resolve_parameters(requests, context={'offset': 10})
+    elapsed = time.perf_counter() - start
+    assert results == {'opt0': 10, 'opt1': 11, 'opt2': 12, 'opt3': 13}
+    assert elapsed < 3 * delay
+
+
+class TestResolveParametersDependencies:
+    def setup_method(self):
+        self.calls = []
+
+        def load_storage(user_input, context):
+            self.calls.append('storage')
+            time.sleep(0.05)
+            return {'engine': "engine from " + user_input}
+
+        def from_storage(user_input, context):
+            self.calls.append(user_input)
+            return context['storage'][user_input] + f" ({context['mode']})"
+
+        self.storage = Argument("storage", getter=load_storage)
+        self.engine = Option("--engine", getter=from_storage,
+                             depends_on=['storage'])
+        self.other = Option("--other", depends_on=['storage', 'engine'],
+                            getter=lambda user_input, context:
+                            (user_input, context['engine']))
+
+    def test_dependency_order(self):
+        requests = {
+            'other': (self.other, "x"),
+            'engine': (self.engine, "engine"),
+            'storage': (self.storage, "file.db"),
+        }
+        context = {'mode': "fast"}
+        results = resolve_parameters(requests, context)
+        assert list(results) == ['other', 'engine', 'storage']
+        assert results['engine'] == "engine from file.db (fast)"
+        assert results['other'] == ("x", "engine from file.db (fast)")
+        assert self.calls == ['storage', 'engine']
+        assert context == {'mode': "fast"}  # not modified
+
+    def test_dependency_in_context(self):
+        context = {'storage': {'engine': "given"}, 'mode': "slow"}
+        results = resolve_parameters({'engine': (self.engine, "engine")},
+                                     context)
+        assert results == {'engine': "given (slow)"}
+
+    def test_missing_dependency(self):
+        with pytest.raises(ValueError, match="unknown parameters"):
+            resolve_parameters({'engine': (self.engine, "engine")})
+
+    def test_cycle(self):
+        a = Option("--a", depends_on=['b'])
+        b = Option("--b", depends_on=['a'])
+        with pytest.raises(ValueError):
+            resolve_parameters({'a': (a, 1), 'b': (b, 2)})
+
+    def test_error_propagates(self):
+        def fail(user_input, context):
+            raise click.BadParameter("bad")
+
+        bad = Option("--bad", getter=fail)
+        requests = {'bad': (bad, 1), 'storage': (self.storage, "file.db")}
+        with pytest.raises(click.BadParameter, match="bad"):
+            resolve_parameters(requests)
+
+
+class TestLazyResult:
+    def setup_method(self):
+        self.factory = MagicMock(return_value=[1, 2, 3])
+        self.lazy = LazyResult(self.factory)
+
+    def test_not_resolved_until_used(self):
+        assert not is_resolved(self.lazy)
+        assert not self.factory.called
+        assert len(self.lazy) == 3
+        assert is_resolved(self.lazy)
+        assert is_resolved("foo")
+        assert self.lazy[0] == 1
+        assert 2 in self.lazy
+        assert list(self.lazy) == [1, 2, 3]
+        assert self.lazy == [1, 2, 3]
+        self.lazy.append(4)
+        assert self.lazy.count(4) == 1
+        self.factory.assert_called_once_with()
+
+    def test_transparent(self):
+        assert isinstance(self.lazy, list)
+        assert repr(self.lazy) == "[1, 2, 3]"
+        assert resolve_lazy(self.lazy) is self.factory.return_value
+        assert resolve_lazy("foo") == "foo"
+
+    def test_operators(self):
+        number = LazyResult(lambda: 5)
+        assert number + 1 == 6
+        assert 1 + number == 6
+        assert number + LazyResult(lambda: 2) == 7
+        assert 12 // number == 2
+        assert divmod(number, 2) == (2, 1)
+        assert -number == -5
+        assert abs(LazyResult(lambda: -5)) == 5
+        assert number < 6 and number >= 5 and 4 < number
+        assert not number > 5
+        assert sorted([LazyResult(lambda: 3), 1, number]) == [1, 3, 5]
+        assert int(LazyResult(lambda: "5")) == 5
+        assert float(number) == 5.0
+        assert f"{number:03d}" == "005"
+        assert ["a", "b", "c"][LazyResult(lambda: 1)] == "b"
+        assert os.fspath(LazyResult(lambda: "file.db")) == "file.db"
+        total = number
+        total += 1
+        assert total == 6 and number == 5
+
+    def test_inplace_mutable(self):
+        self.lazy += [4]
+        assert self.factory.return_value == [1, 2, 3, 4]
+
+    def test_attributes_not_shadowed(self):
+        obj = MagicMock(is_resolved="obj", _resolve="obj", _value="obj",
+                        _factory="obj")
+        lazy = LazyResult(lambda: obj)
+        for name in ['is_resolved', '_resolve', '_value', '_factory']:
+            assert getattr(lazy, name) == "obj"
+
+    def test_setattr(self):
+        obj = MagicMock()
+        lazy = LazyResult(lambda: obj)
+        lazy.foo = "bar"
+        assert obj.foo == "bar"
+
+    def test_lazy_parameter(self):
+        getter = MagicMock(return_value="engine")
+        param = Option("--engine", getter=getter, lazy=True)
+        result = param.get("input", {'foo': 1})
+        assert not getter.called
+        assert result.upper() == "ENGINE"
+        getter.assert_called_once_with("input", {'foo': 1})
+
+    def test_lazy_parameter_only_get(self):
+        calls = []
+
+        def getter(user_input, context):
+            calls.append(user_input)
+            return user_input.upper()
+
+        param = Option("--engine", getter=getter, lazy=True)
+        assert param.get_many(["a", "b"]) == ["A", "B"]
+        assert asyncio.run(param.get_async("c")) == "C"
+        assert calls == ["a", "b", "c"]
+
+    def test_lazy_parameter_error(self):
+        getter = MultiStrategyGetter(
+            [lambda user_input, context: NOT_PARSED],
+            "bad input '{user_input}'"
+        )
+        param = Option("--engine", getter=getter, lazy=True)
+        result = param.get("foo")  # no error yet
+        with pytest.raises(click.BadParameter, match="bad input 'foo'"):
+            result.upper()
+
+
 class TestMultiStrategyGetter:
     def setup_method(self):
         self.pass_strategy = lambda user_input, context: str(user_input)
@@ -94,3 +319,142 @@ class TestMultiStrategyGetter:
             error_message=self.error_message
         )
         assert getter(3) == "3"
+
+    def test_cache(self):
+        strategy = MagicMock(side_effect=lambda user_input, context:
+                             str(user_input))
+        getter = MultiStrategyGetter([strategy], self.error_message,
+                                     cache_size=2,
+                                     cache_context_keys=['storage'])
+        assert getter(3, {'storage': 'a', 'other': 1}) == "3"
+        assert getter(3, {'storage': 'a', 'other': 2}) == "3"
+        assert strategy.call_count == 1
+        # different value for a cache context key misses the cache
+        assert getter(3, {'storage': 'b'}) == "3"
+        assert strategy.call_count == 2
+        # LRU eviction: (3, 'a') is oldest
+        assert getter(4, {'storage': 'a'}) == "4"
+        assert getter(3, {'storage': 'a'}) == "3"
+        assert strategy.call_count == 4
+        getter.clear_cache()
+        assert getter(3, {'storage': 'a'}) == "3"
+        assert strategy.call_count == 5
+
+    def test_cache_unhashable(self):
+        strategy = MagicMock(side_effect=lambda user_input, context: "x")
+        getter = MultiStrategyGetter([strategy], self.error_message,
+                                     cache_size=2)
+        assert getter(['a']) == "x"
+        assert getter(['a']) == "x"
+        assert strategy.call_count == 2
+
+    def test_cache_failure_not_cached(self):
+        getter = MultiStrategyGetter([self.fail_strategy],
+                                     self.error_message, cache_size=2)
+        for _ in range(2):
+            with pytest.raises(click.BadParameter):
+                getter(3)
+        assert len(getter._cache) == 0
+
+    @pytest.mark.parametrize('adaptive', [True, False])
+    def test_adaptive(self, adaptive):
+        first = MagicMock(side_effect=lambda user_input, context:
+                          "first" if user_input == "a" else NOT_PARSED)
+        second = MagicMock(side_effect=lambda user_input, context:
+                           "second" if user_input == "b" else NOT_PARSED)
+        getter = MultiStrategyGetter([first, second], self.error_message,
+                                     adaptive=adaptive)
+        assert getter("b") == "second"
+        assert getter("b") == "second"
+        assert getter.successes == [0, 2]
+        # adaptive tries second strategy first after it succeeded
+        expected_first_calls = 1 if adaptive else 2
+        assert first.call_count == expected_first_calls
+        assert getter("a") == "first"
+
+    def test_get_many(self):
+        # batch strategy resolves even numbers, single strategy the rest
+        evens = MagicMock(side_effect=lambda inputs, context: [
+            f"even {i}" if i % 2 == 0 else NOT_PARSED for i in inputs
+        ])
+        single_calls = []
+
+        def single(user_input, context):
+            single_calls.append(user_input)
+            return f"odd {user_input}"
+
+        getter = MultiStrategyGetter([BatchStrategy(evens), single],
+                                     self.error_message, cache_size=10)
+        assert getter.get_many([1, 2, 3, 4]) == ["odd 1", "even 2",
+                                                 "odd 3", "even 4"]
+        evens.assert_called_once_with([1, 2, 3, 4], {})
+        assert single_calls == [1, 3]
+        assert getter.successes == [2, 2]
+        # cached results aren't passed to strategies again
+        assert getter.get_many([2, 3, 6]) == ["even 2", "odd 3", "even 6"]
+        assert evens.call_args.args[0] == [6]
+
+    def test_get_many_fail(self):
+        getter = MultiStrategyGetter([self.fail_strategy],
+                                     self.error_message)
+        with pytest.raises(click.BadParameter,
+                           match="bad input '3'; bad input '4'"):
+            getter.get_many([3, 4])
+
+    def test_get_many_async_strategies(self):
+        async def evens(inputs, context):
+            return [f"even {i}" if i % 2 == 0 else NOT_PARSED
+                    for i in inputs]
+
+        async def single(user_input, context):
+            return f"odd {user_input}"
+
+        getter = MultiStrategyGetter([BatchStrategy(evens), single],
+                                     self.error_message)
+        assert getter.get_many([1, 2, 3]) == ["odd 1", "even 2", "odd 3"]
+        assert getter.successes == [1, 2]
+        # the batch strategy also works for single inputs
+        assert getter(4) == "even 4"
+        assert asyncio.run(getter.get_async(6)) == "even 6"
+
+    def test_get_many_wrong_length(self):
+        strategy = BatchStrategy(lambda inputs, context: inputs[:1])
+        getter = MultiStrategyGetter([strategy], self.error_message)
+        with pytest.raises(ValueError, match="returned 1 results for 2"):
+            getter.get_many([3, 4])
+
+    def test_batch_strategy_single(self):
+        strategy = BatchStrategy(lambda inputs, context: [str(i)
+                                                          for i in inputs])
+        getter = MultiStrategyGetter([strategy], self.error_message)
+        assert getter(3) == "3"
+
+    def test_async_strategies(self):
+        async def async_fail(user_input, context):
+            return NOT_PARSED
+
+        async def async_pass(user_input, context):
+            return f"async {user_input}"
+
+        getter = MultiStrategyGetter(
+            [async_fail, self.fail_strategy, async_pass, self.pass_strategy],
+            self.error_message, cache_size=4
+        )
+        assert asyncio.run(getter.get_async(3)) == "async 3"
+        assert getter.successes == [0, 0, 1, 0]
+        assert getter(4) == "async 4"
+        # cached result
+        getter.strategies = []
+        assert asyncio.run(getter.get_async(3)) == "async 3"
+
+    def test_get_async_fail(self):
+        getter = MultiStrategyGetter([self.fail_strategy],
+                                     self.error_message)
+        with pytest.raises(click.BadParameter, match=self.expected_error):
+            asyncio.run(getter.get_async(3))
+
+    def test_parameter_uses_getter_get_async(self):
+        getter = MultiStrategyGetter([self.pass_strategy],
+                                     self.error_message)
+        param = Option("--foo", getter=getter)
+        assert asyncio.run(param.get_async(3)) == "3"
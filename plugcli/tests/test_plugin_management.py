@@ -1,8 +1,15 @@
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
+import os
 import pathlib
+import shutil
+import sys
+import warnings
+import time
 import importlib
+import importlib.util
+import importlib.metadata
 
 from plugcli.plugin_management import *
 
@@ -10,6 +17,138 @@ from plugcli.plugin_management import *
 import click
 
 
+@pytest.mark.parametrize('short_help', [None, "declared help"])
+def test_command_plugin_short_help(short_help):
+    command = click.Command("foo", short_help="command help")
+    plugin = CommandPlugin(command=command, section="Simulation",
+                           short_help=short_help,
+                           requires_lib=(1, 0, 0), requires_cli=(2, 0, 0))
+    expected = short_help if short_help is not None else "command help"
+    assert plugin.short_help == expected
+
+
+def test_plugins_use_slots():
+    command = click.Command("foo")
+    plugin = CommandPlugin(command=command, section="Simulation",
+                           requires_lib=None, requires_cli=None)
+    lazy = LazyCommandPlugin(name="foo", section="Simulation",
+                             location="foo.py",
+                             loader=FilePluginLoader("foo", CommandPlugin))
+    for obj in [plugin, lazy]:
+        assert not hasattr(obj, '__dict__')
+
+    class CustomPlugin(CommandPlugin):
+        pass
+
+    custom = CustomPlugin(command=command, section="Simulation",
+                          requires_lib=None, requires_cli=None)
+    custom.extra = "subclasses can still add attributes"
+    assert custom.extra
+
+
+def test_find_plugins_from_dict():
+    plugin = CommandPlugin(command=click.Command("foo"), section="Simulation",
+                           requires_lib=None, requires_cli=None)
+    loader = FilePluginLoader("foo", CommandPlugin)
+    found = list(loader._find_plugins({"foo.py": {'PLUGIN': plugin,
+                                                  'other': 1}}))
+    assert found == [plugin]
+    assert plugin.location == "foo.py"
+
+
+class TestCompatibility:
+    def setup_method(self):
+        self.entries = [
+            {'name': "old", 'section': "A", 'short_help': None,
+             'location': "old.py", 'requires_lib': [1, 0],
+             'requires_cli': None},
+            {'name': "new", 'section': "A", 'short_help': None,
+             'location': "new.py", 'requires_lib': [2, 1],
+             'requires_cli': [1, 0]},
+        ]
+
+    def _loader(self, **kwargs):
+        return FilePluginLoader("foo", CommandPlugin, lib_version=(2, 0),
+                                cli_version=(1, 0), **kwargs)
+
+    def test_skip(self):
+        loader = self._loader(incompatible="skip")
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            plugins = loader.lazy_plugins(self.entries)
+        assert [p.name for p in plugins] == ["old"]
+
+    def test_warn(self):
+        loader = self._loader()
+        with pytest.warns(UserWarning, match=r"'new' from new.py requires "
+                          r"library version \(2, 1\) \(found \(2, 0\)\)"):
+            plugins = loader.lazy_plugins(self.entries)
+        assert [p.name for p in plugins] == ["old"]
+
+    def test_error(self):
+        loader = self._loader(incompatible="error")
+        with pytest.raises(PluginCompatibilityError, match="'new'"):
+            loader.lazy_plugins(self.entries)
+
+    def test_no_versions_given(self):
+        loader = FilePluginLoader("foo", CommandPlugin, incompatible="error")
+        assert len(loader.lazy_plugins(self.entries)) == 2
+
+    def test_bad_policy(self):
+        with pytest.raises(ValueError, match="incompatible"):
+            self._loader(incompatible="ignore")
+
+    def test_incompatibility_cached(self):
+        loader = self._loader()
+        reason = loader._incompatibility([1, 0], [2, 0])
+        assert reason == "requires CLI version (2, 0) (found (1, 0))"
+        assert loader._incompatibilities == {((1, 0), (2, 0)): reason}
+        loader.lib_version = (0, 1)  # cached result is reused
+        assert loader._incompatibility((1, 0), (2, 0)) == reason
+
+    def test_version_padding(self):
+        loader = FilePluginLoader("foo", CommandPlugin, lib_version=(1, 0),
+                                  cli_version=(1, 0, 0))
+        assert loader._incompatibility((1, 0, 0), (1, 0)) is None
+        assert loader._incompatibility((1, 0, 1), None) is not None
+
+    def test_version_strings(self):
+        loader = FilePluginLoader("foo", CommandPlugin,
+                                  lib_version="2.1.0.dev0",
+                                  cli_version="1.0")
+        assert loader.lib_version == (2, 1, 0)
+        assert loader.cli_version == (1, 0)
+        assert loader._incompatibility("2.1", "1.0.0") is None
+        assert loader._incompatibility("2.2", None) is not None
+
+    @pytest.mark.parametrize('requirement', ["dev", ("1", "0")])
+    def test_bad_requirement(self, requirement):
+        entries = [dict(self.entries[0], requires_lib=requirement)]
+        # not checked when the loader has no versions
+        loader = FilePluginLoader("foo", CommandPlugin, incompatible="error")
+        assert len(loader.lazy_plugins(entries)) == 1
+        # otherwise, handled by the incompatible policy
+        with pytest.warns(UserWarning, match="invalid library version"):
+            assert self._loader().lazy_plugins(entries) == []
+        # only the compared side is parsed
+        loader = FilePluginLoader("foo", CommandPlugin, cli_version=(1, 0),
+                                  incompatible="error")
+        assert len(loader.lazy_plugins(entries)) == 1
+
+    @pytest.mark.parametrize('version', ["dev", 1, ("1", "0")])
+    def test_bad_version(self, version):
+        with pytest.raises((TypeError, ValueError), match="ersion"):
+            FilePluginLoader("foo", CommandPlugin, lib_version=version)
+
+    def test_call_filters_loaded_plugins(self):
+        examples = pathlib.Path(__file__).resolve().parent / "plugin_examples"
+        loader = FilePluginLoader(examples, CommandPlugin, cli_version=(1, 0),
+                                  incompatible="skip")
+        assert loader() == []
+        # the index is not filtered, so it can be cached across upgrades
+        assert len(loader.index()) == 2
+
+
 class PluginLoaderTest(object):
     def setup_method(self):
         self.expected_section = {'exampleA': "Simulation",
@@ -43,11 +182,95 @@ class PluginLoaderTest(object):
         assert plugin.section == self.expected_section[command]
         assert plugin.plugin_type == self.plugin_type
 
+    @pytest.mark.parametrize('command', ['exampleA', 'exampleB'])
+    def test_index(self, command):
+        index = {entry['name']: entry for entry in self.loader.index()}
+        entry = index[command]
+        expected_loc = self.loader._candidate_key(
+            self._make_candidate(command)
+        )
+        assert entry['location'] == expected_loc
+        assert entry['section'] == self.expected_section[command]
+        assert entry['requires_lib'] == (1, 0, 0)
+        assert entry['requires_cli'] == (2, 0, 0)
+
+    @pytest.mark.parametrize('command', ['exampleA', 'exampleB'])
+    def test_lazy_plugins(self, command):
+        index = self.loader.index()
+        loader = self.LoaderClass(self.loader.search_path, CommandPlugin)
+        plugins = {p.name: p for p in loader.lazy_plugins(index)}
+        plugin = plugins[command]
+        assert isinstance(plugin, LazyCommandPlugin)
+        assert plugin.section == self.expected_section[command]
+        assert plugin.plugin_type == self.plugin_type
+        assert plugin.requires_lib == (1, 0, 0)
+        assert not plugin.is_loaded
+        assert loader._loaded_candidates == {}
+        assert isinstance(plugin.command, click.Command)
+        assert plugin.command.name == command
+        assert plugin.is_loaded
+        assert list(loader._loaded_candidates) == [plugin.location]
+
+    def test_static_index(self):
+        loader = self.LoaderClass(self.loader.search_path, CommandPlugin,
+                                  static=True)
+        with patch.object(loader, 'load_candidate',
+                          side_effect=AssertionError("executed")):
+            static_index = loader.index()
+        assert static_index == self.loader.index()
+
+    def test_static_index_fallback(self):
+        loader = self.LoaderClass(self.loader.search_path, CommandPlugin,
+                                  static=True)
+        with patch.object(loader, '_candidate_source', return_value=None):
+            index = loader.index()
+        assert index == self.loader.index()
+        assert len(loader._loaded_candidates) >= 2
+
+    def test_load_plugin_missing(self):
+        key = self.loader._candidate_key(self._make_candidate('exampleA'))
+        with pytest.raises(PluginRegistrationError, match="not found"):
+            self.loader.load_plugin(key, 'exampleB')
+
+    def test_call_concurrent(self):
+        loader = self.LoaderClass(self.loader.search_path, CommandPlugin,
+                                  max_workers=4)
+        with patch.object(loader, '_make_nsdict',
+                          wraps=loader._make_nsdict) as make_nsdict:
+            plugins = loader()
+        assert make_nsdict.call_count >= 2
+        names = [p.name for p in plugins]
+        assert names == [p.name for p in self.loader()]
+        assert names.index('exampleA') < names.index('exampleB')
+
+    def test_find_plugins_streaming(self):
+        # each candidate is loaded only when its plugins are needed
+        with patch.object(self.loader, '_make_nsdict',
+                          wraps=self.loader._make_nsdict) as make_nsdict:
+            namespaces = self.loader._find_candidate_namespaces()
+            plugins = self.loader._find_plugins(namespaces)
+            assert make_nsdict.call_count == 0
+            first = next(plugins)
+            assert make_nsdict.call_count == 1
+            assert first.name == 'exampleA'
+            assert [p.name for p in plugins] == ['exampleB']
+
     def test_bad_namespace(self):
         loader = self.LoaderClass("nonexistent_foo", CommandPlugin)
         assert loader._find_candidates() == []
 
 
+def test_map_preserves_order():
+    def slow_identity(x):
+        time.sleep(0.01 * (5 - x))  # earlier items finish later
+        return x
+
+    loader = CLIPluginLoader("file", "foo", max_workers=5)
+    assert loader._map(slow_identity, range(5)) == list(range(5))
+    sequential = CLIPluginLoader("file", "foo")
+    assert sequential._map(slow_identity, range(5)) == list(range(5))
+
+
 class TestFilePluginLoader(PluginLoaderTest):
     LoaderClass = FilePluginLoader
     def setup_method(self):
@@ -61,6 +284,112 @@ class TestFilePluginLoader(PluginLoaderTest):
     def _make_candidate(self, command):
         return self.commands_dir / (command + ".py")
 
+    def test_make_nsdict_bytecode_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+        source = tmp_path / "plugin.py"
+        source.write_text("FOO = 1\n")
+        nsdict = self.loader._make_nsdict(source)
+        assert nsdict['FOO'] == 1
+        cached = pathlib.Path(importlib.util.cache_from_source(str(source)))
+        assert cached.exists()
+
+        # the cached bytecode is reused if the source is unchanged
+        with patch('importlib.machinery.SourceFileLoader.source_to_code',
+                   side_effect=AssertionError("recompiled")):
+            assert self.loader._make_nsdict(source)['FOO'] == 1
+
+        # ... and is invalidated when the source changes
+        source.write_text("FOO = 22\n")
+        assert self.loader._make_nsdict(source)['FOO'] == 22
+
+
+class TestFilePluginLoaderSearchPaths:
+    def setup_method(self):
+        self.plugin_source = "\n".join([
+            "import click",
+            "from plugcli.plugin_management import CommandPlugin",
+            "@click.command('{name}')",
+            "def cmd(): pass",
+            "PLUGIN = CommandPlugin(cmd, '{section}', requires_lib=None, "
+            "requires_cli=None)",
+        ])
+
+    def _write_plugin(self, directory, filename, name, section):
+        directory.mkdir(exist_ok=True)
+        source = self.plugin_source.format(name=name, section=section)
+        (directory / filename).write_text(source)
+
+    def test_static_index_not_utf8(self, tmp_path):
+        # not valid UTF-8, but Python can load it
+        source = ("# -*- coding: latin-1 -*-\n# caf\xe9\n"
+                  + self.plugin_source.format(name="foo", section="A"))
+        (tmp_path / "foo.py").write_bytes(source.encode('latin-1'))
+        loader = FilePluginLoader(tmp_path, CommandPlugin, static=True)
+        assert loader._candidate_source(str(tmp_path / "foo.py")) is None
+        assert [entry['name'] for entry in loader.index()] == ["foo"]
+
+    def test_precedence(self, tmp_path):
+        user, site = tmp_path / "user", tmp_path / "site"
+        self._write_plugin(user, "foo.py", "foo", "User")
+        self._write_plugin(site, "foo.py", "foo", "Site")
+        self._write_plugin(site, "bar.py", "bar", "Site")
+        loader = FilePluginLoader([user, site, tmp_path / "missing"],
+                                  CommandPlugin)
+        with pytest.warns(UserWarning, match="shadowed") as record:
+            plugins = loader()
+        assert len(record) == 1
+        assert [(p.name, p.section) for p in plugins] == [("foo", "User"),
+                                                          ("bar", "Site")]
+        assert plugins[0].location == str(user / "foo.py")
+
+        # duplicates are only reported once
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            assert len(loader._find_candidates()) == 2
+
+    def test_command_precedence(self, tmp_path):
+        # different filenames, same command: the earlier directory wins
+        hi, lo = tmp_path / "hi", tmp_path / "lo"
+        self._write_plugin(hi, "user_sim.py", "simulate", "High")
+        self._write_plugin(lo, "simulate.py", "simulate", "Low")
+        self._write_plugin(lo, "other.py", "other", "Low")
+        loader = FilePluginLoader([hi, lo], CommandPlugin)
+        with pytest.warns(UserWarning, match="'simulate' from .* is "
+                          "shadowed by") as record:
+            plugins = loader()
+        assert len(record) == 1
+        assert [(p.name, p.section) for p in plugins] == [
+            ("simulate", "High"), ("other", "Low")
+        ]
+
+        # the same applies to lazy plugins, and is only reported once
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            lazy = loader.lazy_plugins(loader.index())
+        assert [(p.name, p.section) for p in lazy] == [
+            ("simulate", "High"), ("other", "Low")
+        ]
+
+    def test_skips_non_files(self, tmp_path):
+        self._write_plugin(tmp_path, "foo.py", "foo", "A")
+        (tmp_path / "dir.py").mkdir()
+        (tmp_path / "_private.py").write_text("raise RuntimeError()")
+        loader = FilePluginLoader(tmp_path, CommandPlugin)
+        assert loader._find_candidates() == [str(tmp_path / "foo.py")]
+
+    def test_unchanged_directory_not_rescanned(self, tmp_path):
+        self._write_plugin(tmp_path, "foo.py", "foo", "A")
+        loader = FilePluginLoader(tmp_path, CommandPlugin)
+        assert len(loader._find_candidates()) == 1
+        with patch('os.scandir', side_effect=AssertionError("rescanned")):
+            assert len(loader._find_candidates()) == 1
+
+        self._write_plugin(tmp_path, "bar.py", "bar", "A")
+        # make sure the directory's mtime changes, even on coarse clocks
+        stat = os.stat(tmp_path)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert len(loader._find_candidates()) == 2
+
 
 class TestNamespacePluginLoader(PluginLoaderTest):
     LoaderClass = NamespacePluginLoader
@@ -73,3 +402,178 @@ class TestNamespacePluginLoader(PluginLoaderTest):
     def _make_candidate(self, command):
         name = self.namespace + "." + command
         return importlib.import_module(name)
+
+
+ENTRY_POINTS = """\
+[plugcli_test_plugins]
+exampleA = plugcli_test_ep_plugins.exampleA:PLUGIN
+exampleB = plugcli_test_ep_plugins.exampleB
+"""
+
+
+@pytest.fixture(scope='class')
+def entry_point_dist(tmp_path_factory):
+    # install a fake distribution that advertises copies of the example
+    # plugins (a module's plugins can only be registered by one loader, and
+    # the originals are used by the namespace loader tests)
+    site = tmp_path_factory.mktemp("site")
+    package = site / "plugcli_test_ep_plugins"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    examples = pathlib.Path(__file__).resolve().parent / "plugin_examples"
+    for name in ['exampleA', 'exampleB']:
+        shutil.copy(examples / (name + ".py"), package)
+    dist_info = site / "plugcli_test_plugins-1.0.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text(
+        "Metadata-Version: 2.1\nName: plugcli-test-plugins\nVersion: 1.0\n"
+    )
+    (dist_info / "entry_points.txt").write_text(ENTRY_POINTS)
+    sys.path.append(str(site))
+    importlib.invalidate_caches()
+
+    yield package
+
+    sys.path.remove(str(site))
+    for name in list(sys.modules):
+        if name.split(".")[0] == "plugcli_test_ep_plugins":
+            del sys.modules[name]
+
+
+@pytest.mark.usefixtures('entry_point_dist')
+class TestEntryPointPluginLoader(PluginLoaderTest):
+    LoaderClass = EntryPointPluginLoader
+    def setup_method(self):
+        super().setup_method()
+        self.group = "plugcli_test_plugins"
+        self.loader = self.LoaderClass(self.group, CommandPlugin)
+        self.plugin_type = 'entry_point'
+
+    def _make_candidate(self, command):
+        value = {
+            'exampleA': "plugcli_test_ep_plugins.exampleA:PLUGIN",
+            'exampleB': "plugcli_test_ep_plugins.exampleB",
+        }[command]
+        return importlib.metadata.EntryPoint(name=command, value=value,
+                                             group=self.group)
+
+    def test_candidate_key_roundtrip(self):
+        candidate = self._make_candidate('exampleA')
+        key = self.loader._candidate_key(candidate)
+        assert key == "exampleA=plugcli_test_ep_plugins.exampleA:PLUGIN"
+        assert self.loader._candidate_from_key(key) == candidate
+
+    def test_candidate_fingerprints(self, entry_point_dist):
+        key = self.loader._candidate_key(self._make_candidate('exampleB'))
+        fingerprint = self.loader._candidate_fingerprints()[key]
+        assert fingerprint[:2] == ["plugcli-test-plugins", "1.0"]
+        # editing the module (e.g., in an editable install) changes it
+        module = entry_point_dist / "exampleB.py"
+        module.write_text(module.read_text() + "\n# edited\n")
+        assert self.loader._candidate_fingerprints()[key] != fingerprint
+
+    def test_same_modules_in_other_loader(self):
+        self.loader()
+        loader = NamespacePluginLoader("plugcli_test_ep_plugins",
+                                       CommandPlugin)
+        with pytest.raises(PluginRegistrationError, match="previously"):
+            loader()
+
+    def test_find_candidates_does_not_import(self):
+        with patch.object(importlib.metadata.EntryPoint, 'load',
+                          side_effect=AssertionError("loaded")):
+            keys = self.loader._find_candidate_keys()
+        assert len(keys) == 2
+
+    def test_static_index_attr_selects_plugin(self):
+        # exampleA's entry point names a single object in its module
+        loader = self.LoaderClass(self.group, CommandPlugin, static=True)
+        key = loader._candidate_key(self._make_candidate('exampleA'))
+        source = "\n".join([
+            "@click.command('one')",
+            "def one(): pass",
+            "@click.command('two')",
+            "def two(): pass",
+            "PLUGIN = CommandPlugin(one, 'A', requires_lib=None, "
+            "requires_cli=None)",
+            "OTHER = CommandPlugin(two, 'B', requires_lib=None, "
+            "requires_cli=None)",
+        ])
+        with patch.object(loader, '_candidate_source', return_value=source):
+            entries = loader._static_index_candidate(key)
+        assert [entry['name'] for entry in entries] == ['one']
+
+
+@pytest.fixture(scope='class')
+def example_bundle(request, tmp_path_factory):
+    from plugcli.bundle import build_bundle
+    examples = pathlib.Path(__file__).resolve().parent / "plugin_examples"
+    bundle = tmp_path_factory.mktemp("bundle") / "plugins.zip"
+    build_bundle(examples, bundle)
+    request.cls.bundle = bundle
+    yield bundle
+
+
+@pytest.mark.usefixtures('example_bundle')
+class TestBundlePluginLoader(PluginLoaderTest):
+    LoaderClass = BundlePluginLoader
+    def setup_method(self):
+        super().setup_method()
+        self.loader = self.LoaderClass(self.bundle, CommandPlugin)
+        self.plugin_type = 'bundle'
+
+    def _make_candidate(self, command):
+        return str(self.bundle / (command + ".py"))
+
+    def test_static_index_fallback(self):
+        # without index entries in the table of contents, plugins are loaded
+        toc, members = self.loader._bundle_contents()
+        no_entries = {member: {'entries': None}
+                      for member in toc['candidates']}
+        self.loader._contents = (dict(toc, candidates=no_entries), members)
+        expected = self.LoaderClass(self.bundle, CommandPlugin).index()
+        assert self.loader.index() == expected
+        assert len(self.loader._loaded_candidates) == 2
+
+    def test_single_read(self):
+        with patch('builtins.open', wraps=open) as mock_open:
+            plugins = self.loader()
+            self.loader.index()
+        assert len(plugins) == 2
+        assert mock_open.call_count == 1
+
+    def test_bytecode_magic_mismatch(self):
+        toc, members = self.loader._bundle_contents()
+        self.loader._contents = (dict(toc, magic="00000000"), members)
+        with patch('marshal.loads',
+                   side_effect=AssertionError("used bytecode")):
+            nsdict = self.loader._make_nsdict(self._make_candidate('exampleA'))
+        assert nsdict['PLUGIN'].section == "Simulation"
+
+    def test_unsupported_format(self, tmp_path):
+        import zipfile
+        bundle = tmp_path / "bad.zip"
+        with zipfile.ZipFile(bundle, 'w') as archive:
+            archive.writestr("toc.json", '{"format": 999}')
+        loader = self.LoaderClass(bundle, CommandPlugin)
+        with pytest.raises(PluginRegistrationError, match="format"):
+            loader._find_candidates()
+
+    def test_truncated_bundle(self, tmp_path):
+        bundle = tmp_path / "truncated.zip"
+        bundle.write_bytes(self.bundle.read_bytes()[:100])
+        loader = self.LoaderClass(bundle, CommandPlugin)
+        with pytest.raises(PluginRegistrationError, match="truncated.zip"):
+            loader._find_candidates()
+
+    @pytest.mark.parametrize('toc', [None, "not json"])
+    def test_bad_toc(self, tmp_path, toc):
+        import zipfile
+        bundle = tmp_path / "bad.zip"
+        with zipfile.ZipFile(bundle, 'w') as archive:
+            archive.writestr("other.txt", "")
+            if toc is not None:
+                archive.writestr("toc.json", toc)
+        loader = self.LoaderClass(bundle, CommandPlugin)
+        with pytest.raises(PluginRegistrationError, match="toc.json"):
+            loader._find_candidates()
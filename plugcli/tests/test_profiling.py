@@ -0,0 +1,135 @@
+import pytest
+from unittest.mock import patch
+
+import json
+import pathlib
+import sys
+import tracemalloc
+
+from plugcli import profiling
+from plugcli.profiling import *
+from plugcli.plugin_management import FilePluginLoader, CommandPlugin
+
+EXAMPLES = pathlib.Path(__file__).resolve().parent / "plugin_examples"
+
+
+@pytest.fixture
+def profiler():
+    profiler = enable_profiling(trace_memory=False)
+    yield profiler
+    disable_profiling()
+
+
+class TestStartupProfiler:
+    def setup_method(self):
+        self.profiler = StartupProfiler(trace_memory=False)
+        with self.profiler.record("fast", "file"):
+            pass
+        with self.profiler.record("slow", "namespace"):
+            sys.modules['_plugcli_fake_module'] = None
+        del sys.modules['_plugcli_fake_module']
+        # make sure that slow really is slower
+        self.profiler.records['slow']['time'] += 1.0
+
+    def test_record(self):
+        slow = self.profiler.records['slow']
+        assert slow['plugin_type'] == "namespace"
+        assert slow['new_modules'] == 1
+        assert self.profiler.records['fast']['new_modules'] == 0
+
+    def test_record_accumulates(self):
+        time_before = self.profiler.records['fast']['time']
+        with self.profiler.record("fast", "file"):
+            sys.modules['_plugcli_fake_module'] = None
+        del sys.modules['_plugcli_fake_module']
+        assert self.profiler.records['fast']['new_modules'] == 1
+        assert self.profiler.records['fast']['time'] >= time_before
+
+    def test_results(self):
+        results = self.profiler.results()
+        assert [rec['candidate'] for rec in results] == ['slow', 'fast']
+
+    def test_format_table(self):
+        lines = self.profiler.format_table().splitlines()
+        assert lines[0].split()[0] == "candidate"
+        assert [line.split()[0] for line in lines[2:]] == ['slow', 'fast',
+                                                           'TOTAL']
+
+    def test_to_json(self):
+        report = json.loads(self.profiler.to_json())
+        assert len(report['candidates']) == 2
+        assert report['total']['new_modules'] == 1
+
+    def test_emit_stderr(self, capsys):
+        self.profiler.emit("stderr")
+        assert "TOTAL" in capsys.readouterr().err
+
+    @pytest.mark.parametrize('filename', ['report.json', 'report.txt'])
+    def test_emit_file(self, tmp_path, filename):
+        destination = tmp_path / filename
+        self.profiler.emit(str(destination))
+        content = destination.read_text()
+        if filename.endswith(".json"):
+            assert json.loads(content)['total']['new_modules'] == 1
+        else:
+            assert "TOTAL" in content
+
+    def test_trace_memory(self):
+        was_tracing = tracemalloc.is_tracing()
+        profiler = StartupProfiler(trace_memory=True)
+        try:
+            assert tracemalloc.is_tracing()
+            with profiler.record("alloc", "file"):
+                data = [0] * 100000
+            assert profiler.records['alloc']['memory'] > 0
+        finally:
+            profiler.stop()
+        assert tracemalloc.is_tracing() == was_tracing
+
+    def test_stop_only_stops_own_tracing(self):
+        tracemalloc.start()
+        try:
+            profiler = StartupProfiler(trace_memory=True)
+            profiler.stop()
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+    def test_emit_stops_tracing(self, tmp_path):
+        profiler = StartupProfiler(trace_memory=True)
+        try:
+            profiler.emit(str(tmp_path / "report.txt"))
+            assert not tracemalloc.is_tracing()
+        finally:
+            profiler.stop()
+
+
+def test_disable_stops_tracing():
+    enable_profiling(trace_memory=True)
+    assert tracemalloc.is_tracing()
+    disable_profiling()
+    assert not tracemalloc.is_tracing()
+
+
+def test_loader_profiling(profiler):
+    loader = FilePluginLoader(EXAMPLES, CommandPlugin)
+    loader()
+    expected = {str(EXAMPLES / (name + ".py"))
+                for name in ['exampleA', 'exampleB']}
+    assert expected <= set(profiler.records)
+
+
+def test_no_profiling():
+    assert get_profiler() is None
+    with profile_candidate("foo", "file"):
+        pass
+
+
+def test_env_variable(monkeypatch):
+    monkeypatch.setenv("PLUGCLI_PROFILE", "stderr")
+    monkeypatch.setattr(profiling._PROFILING, "env_checked", False)
+    with patch('atexit.register') as register:
+        profiler = get_profiler()
+    assert isinstance(profiler, StartupProfiler)
+    register.assert_called_once_with(profiler.emit, "stderr")
+    disable_profiling()
@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import MagicMock
+
+import click
+
+from plugcli.registry import *
+from plugcli.plugin_management import CommandPlugin
+
+
+def make_plugin(name, section, location, plugin_type):
+    plugin = CommandPlugin(command=click.Command(name), section=section,
+                           requires_lib=(1, 0, 0), requires_cli=(2, 0, 0))
+    plugin.attach_metadata(location, plugin_type)
+    return plugin
+
+
+class TestPluginRegistry:
+    def setup_method(self):
+        self.module = MagicMock(__name__="pkg.plugins.mod")
+        self.plugins = {
+            'foo': make_plugin('foo', "Simulation", "foo.py", 'file'),
+            'bar_baz': make_plugin('bar_baz', "Analysis", self.module,
+                                   'namespace'),
+            'qux': make_plugin('qux', "Simulation", self.module,
+                               'namespace'),
+        }
+        self.registry = PluginRegistry()
+        for plugin in self.plugins.values():
+            self.registry.register(plugin)
+
+    def test_iteration(self):
+        assert list(self.registry) == list(self.plugins.values())
+        assert len(self.registry) == 3
+        assert self.registry.names() == ['foo', 'bar-baz', 'qux']
+
+    @pytest.mark.parametrize('name', ['bar_baz', 'bar-baz'])
+    def test_lookup_normalized(self, name):
+        assert name in self.registry
+        assert self.registry[name] is self.plugins['bar_baz']
+        assert self.registry.get(name) is self.plugins['bar_baz']
+
+    def test_lookup_missing(self):
+        assert 'missing' not in self.registry
+        assert self.registry.get('missing') is None
+        with pytest.raises(KeyError):
+            self.registry['missing']
+
+    def test_by_section(self):
+        assert self.registry.section_names("Simulation") == ['foo', 'qux']
+        assert self.registry.by_section("Analysis") == [
+            self.plugins['bar_baz']
+        ]
+        assert self.registry.by_section("Workflow") == []
+
+    @pytest.mark.parametrize('location', ['module', 'module_name'])
+    def test_by_location(self, location):
+        location = {'module': self.module,
+                    'module_name': "pkg.plugins.mod"}[location]
+        assert self.registry.by_location(location) == [
+            self.plugins['bar_baz'], self.plugins['qux']
+        ]
+
+    def test_by_type(self):
+        assert self.registry.by_type('file') == [self.plugins['foo']]
+
+    @pytest.mark.parametrize('kwargs, expected', [
+        ({}, ['foo', 'bar_baz', 'qux']),
+        ({'section': "Simulation"}, ['foo', 'qux']),
+        ({'section': "Simulation", 'plugin_type': 'namespace'}, ['qux']),
+        ({'location': "foo.py", 'plugin_type': 'namespace'}, []),
+    ])
+    def test_query(self, kwargs, expected):
+        expected = [self.plugins[name] for name in expected]
+        assert self.registry.query(**kwargs) == expected
+
+    @pytest.mark.parametrize('by_name', [True, False])
+    def test_deregister(self, by_name):
+        plugin = self.plugins['bar_baz']
+        self.registry.deregister('bar_baz' if by_name else plugin)
+        assert 'bar-baz' not in self.registry
+        assert self.registry.by_section("Analysis") == []
+        assert self.registry.by_location(self.module) == [self.plugins['qux']]
+        assert self.registry.by_type('namespace') == [self.plugins['qux']]
+
+    def test_register_replaces(self):
+        new = make_plugin('foo', "Analysis", "other/foo.py", 'file')
+        assert self.registry.register(new) is self.plugins['foo']
+        assert self.registry['foo'] is new
+        assert self.registry.section_names("Simulation") == ['qux']
+        assert self.registry.by_location("foo.py") == []
+        assert len(self.registry) == 3
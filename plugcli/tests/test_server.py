@@ -0,0 +1,286 @@
+import pytest
+
+import os
+import pathlib
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from plugcli.client import *
+
+pytestmark = pytest.mark.skipif(
+    sys.platform.startswith("win") or not hasattr(socket, "AF_UNIX"),
+    reason="server mode requires Unix domain sockets"
+)
+
+SERVER_SCRIPT = """
+import os
+import sys
+import time
+import click
+from plugcli.cli import CLI
+from plugcli.plugin_management import CommandPlugin
+
+@click.command("info")
+@click.argument("code", type=int, default=0)
+def info(code):
+    click.echo(os.getcwd())
+    click.echo(str(os.environ.get("PLUGCLI_TEST_VAR")))
+    click.echo(sys.stdin.readline().strip())
+    click.echo("to stderr", err=True)
+    sys.exit(code)
+
+@click.command("pid")
+@click.argument("delay", type=float, default=0.0)
+def pid(delay):
+    start = time.time()
+    time.sleep(delay)
+    click.echo(f"{os.getpid()} {start} {time.time()}")
+
+class ServerCLI(CLI):
+    COMMAND_SECTIONS = ["Miscellaneous"]
+    def get_installed_plugins(self):
+        return [CommandPlugin(command=cmd, section="Miscellaneous",
+                              requires_lib=(1, 0), requires_cli=(1, 0))
+                for cmd in [info, pid]]
+
+workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+kwargs = {}
+if len(sys.argv) > 3:
+    kwargs['max_requests'] = int(sys.argv[3]) or None
+ServerCLI().serve(sys.argv[1], workers=workers, preload=True, **kwargs)
+"""
+
+
+def wait_for_socket(path, process, timeout=10.0):
+    start = time.time()
+    while not os.path.exists(path):
+        if process.poll() is not None or time.time() - start > timeout:
+            raise RuntimeError("Server did not start")  # -no-cov-
+        time.sleep(0.02)
+
+
+def start_server(tmp_path, *args):
+    script = tmp_path / "server.py"
+    script.write_text(SERVER_SCRIPT)
+    socket_path = str(tmp_path / "cli.sock")
+    env = dict(os.environ)
+    root = str(pathlib.Path(__file__).resolve().parents[2])
+    env['PYTHONPATH'] = os.pathsep.join([root, env.get('PYTHONPATH', '')])
+    process = subprocess.Popen(
+        [sys.executable, str(script), socket_path] + list(args), env=env
+    )
+    return socket_path, process
+
+
+# arguments: number of workers, max_requests (0 for None)
+@pytest.fixture(params=[[], ["2"], ["1", "0"]],
+                ids=["single", "zygote", "zygote-reused"])
+def server(tmp_path, request):
+    socket_path, process = start_server(tmp_path, *request.param)
+    try:
+        wait_for_socket(socket_path, process)
+        yield socket_path
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run(socket_path, argv, tmp_path, stdin="", label=""):
+    files = {name: tmp_path / f"{name}{label}.txt"
+             for name in ["in", "out", "err"]}
+    files["in"].write_text(stdin)
+    with open(files["in"]) as fin, \
+            open(files["out"], 'w') as fout, \
+            open(files["err"], 'w') as ferr:
+        fds = [fin.fileno(), fout.fileno(), ferr.fileno()]
+        exit_code = run_client(socket_path, argv=argv, fds=fds)
+    return exit_code, files["out"].read_text(), files["err"].read_text()
+
+
+def test_run_command(server, tmp_path, monkeypatch):
+    workdir = tmp_path / "workdir"
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    monkeypatch.setenv("PLUGCLI_TEST_VAR", "from client")
+    exit_code, out, err = run(server, ["prog", "info", "3"], tmp_path,
+                              stdin="input line\n")
+    assert exit_code == 3
+    assert out.splitlines() == [str(workdir), "from client", "input line"]
+    assert err == "to stderr\n"
+
+    # server state is restored between requests
+    monkeypatch.delenv("PLUGCLI_TEST_VAR")
+    exit_code, out, err = run(server, ["prog", "info"], tmp_path)
+    assert exit_code == 0
+    assert out.splitlines()[1] == "None"
+
+
+def test_unread_stdin_not_shared(server, tmp_path):
+    _, out, _ = run(server, ["prog", "info"], tmp_path,
+                    stdin="a\nb\nsecret\n", label="1")
+    assert out.splitlines()[2] == "a"
+    _, out, _ = run(server, ["prog", "info"], tmp_path, stdin="c\n",
+                    label="2")
+    assert out.splitlines()[2] == "c"
+
+
+def test_usage_error(server, tmp_path):
+    exit_code, out, err = run(server, ["prog", "missing"], tmp_path)
+    assert exit_code == 2
+    assert "No such command" in err
+
+
+def test_bad_cwd(server, tmp_path):
+    missing = str(tmp_path / "missing")
+    err_file = tmp_path / "err.txt"
+    with open(os.devnull) as fin, open(os.devnull, 'w') as fout, \
+            open(err_file, 'w') as ferr:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(server)
+            request = {'argv': ["prog", "info"], 'cwd': missing, 'env': {}}
+            send_message(sock, request,
+                         fds=[fin.fileno(), fout.fileno(), ferr.fileno()])
+            response, _ = recv_message(sock)
+        finally:
+            sock.close()
+
+    assert response['exit_code'] == 1
+    assert missing in response['error']
+
+    # the server is still running
+    exit_code, out, err = run(server, ["prog", "pid"], tmp_path)
+    assert exit_code == 0
+
+
+def test_client_reports_error(tmp_path):
+    err_file = tmp_path / "err.txt"
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    socket_path = str(tmp_path / "fake.sock")
+    listener.bind(socket_path)
+    listener.listen()
+
+    def fake_server():
+        conn, _ = listener.accept()
+        _, fds = recv_message(conn, max_fds=3)
+        for fd in fds:
+            os.close(fd)
+        send_message(conn, {'exit_code': 1, 'error': "bad request"})
+        conn.close()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(fake_server)
+        with open(os.devnull) as fin, open(err_file, 'w') as ferr:
+            exit_code = run_client(socket_path, argv=["prog"],
+                                   fds=[fin.fileno(), ferr.fileno(),
+                                        ferr.fileno()])
+        future.result()
+    listener.close()
+    assert exit_code == 1
+    assert err_file.read_text() == "Error from CLI server: bad request\n"
+
+
+def test_zygote_concurrent_and_recycled(tmp_path):
+    socket_path, process = start_server(tmp_path, "2")
+    try:
+        wait_for_socket(socket_path, process)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(run, socket_path, ["prog", "pid", "0.5"],
+                                tmp_path, label=str(i))
+                for i in range(2)
+            ]
+            results = [future.result() for future in futures]
+        # with max_requests=1, workers were replaced after those requests
+        _, out, _ = run(socket_path, ["prog", "pid"], tmp_path, label="3")
+        recycled_pid = out.split()[0]
+    finally:
+        process.terminate()
+        process.wait()
+
+    assert [exit_code for exit_code, _, _ in results] == [0, 0]
+    outputs = [out.split() for _, out, _ in results]
+    pids = {out[0] for out in outputs}
+    assert len(pids) == 2
+    assert str(process.pid) not in pids
+    assert recycled_pid not in pids
+    # the two requests overlapped in time
+    (_, start1, end1), (_, start2, end2) = [
+        (pid, float(start), float(end)) for pid, start, end in outputs
+    ]
+    assert start1 < end2 and start2 < end1
+
+
+def test_server_unavailable(tmp_path):
+    socket_path = str(tmp_path / "missing.sock")
+    with pytest.raises(ServerUnavailable):
+        run_client(socket_path, argv=["prog"])
+    assert main(socket_path, fallback=lambda: "fallback") == "fallback"
+    with pytest.raises(SystemExit) as exc:
+        main(socket_path)
+    assert exc.value.code == 1
+
+
+def test_message_roundtrip():
+    left, right = socket.socketpair()
+    with left, right:
+        send_message(left, {'foo': [1, 2]})
+        assert recv_message(right) == ({'foo': [1, 2]}, [])
+        read_fd, write_fd = os.pipe()
+        try:
+            send_message(left, {'bar': "baz"}, fds=[write_fd])
+            message, fds = recv_message(right, max_fds=3)
+            assert message == {'bar': "baz"}
+            assert len(fds) == 1
+            os.write(fds[0], b"x")
+            os.close(fds[0])
+            assert os.read(read_fd, 1) == b"x"
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+
+def test_bind_only_exposes_listening_socket(tmp_path):
+    from plugcli.server import CLIServer
+    server = CLIServer(cli=None, socket_path=str(tmp_path / "cli.sock"))
+    server.bind()
+    try:
+        assert not os.path.exists(server.socket_path + ".tmp")
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(server.socket_path)
+        client.close()
+    finally:
+        server.close()
+    assert not os.path.exists(server.socket_path)
+
+
+def test_zygote_restart_backoff(tmp_path):
+    from plugcli.server import ZygoteServer
+    server = ZygoteServer(cli=None, socket_path=str(tmp_path / "cli.sock"),
+                          workers=1, preload=False)
+    pids = iter(range(1000, 2000))
+
+    def spawn(listener):
+        pid = next(pids)
+        server._worker_pids.add(pid)
+        return pid
+
+    # 6 failed workers, then one that exits normally, then another failure
+    statuses = [1 << 8] * 6 + [0, 1 << 8]
+    waits = [(1000 + i, status) for i, status in enumerate(statuses)]
+    with patch.object(server, 'bind', return_value=MagicMock()), \
+            patch.object(server, '_spawn_worker',
+                         side_effect=spawn) as spawn_worker, \
+            patch.object(server, '_stop_workers'), \
+            patch('os.wait', side_effect=waits + [KeyboardInterrupt]), \
+            patch('time.sleep') as sleep:
+        with pytest.raises(KeyboardInterrupt):
+            server.serve_forever()
+
+    delays = [call.args[0] for call in sleep.call_args_list]
+    assert delays == [0.1, 0.2, 0.4, 0.8, 1.6, 3.2, 0.1]
+    assert spawn_worker.call_count == 1 + len(statuses)
@@ -0,0 +1,120 @@
+import pytest
+
+import pathlib
+
+from plugcli.static_discovery import *
+
+EXAMPLES = pathlib.Path(__file__).resolve().parent / "plugin_examples"
+
+TEMPLATE = """
+import click
+from plugcli.plugin_management import CommandPlugin
+
+SECTION = "Analysis"
+
+@click.command({decorator_args})
+@click.option("--foo")
+def my_command(foo):
+    pass
+
+{plugin}
+"""
+
+DEFAULT_PLUGIN = """
+PLUGIN = CommandPlugin(
+    command=my_command,
+    section="Simulation",
+    requires_lib=(1, 0, 0),
+    requires_cli=(2, 0),
+)
+"""
+
+
+def make_source(decorator_args='"my-cmd"', plugin=DEFAULT_PLUGIN):
+    return TEMPLATE.format(decorator_args=decorator_args, plugin=plugin)
+
+
+def test_example_file():
+    source = (EXAMPLES / "exampleA.py").read_text()
+    entries = static_index_entries(source, location="exampleA.py")
+    assert entries == [{
+        'name': "exampleA",
+        'section': "Simulation",
+        'short_help': None,
+        'location': "exampleA.py",
+        'requires_lib': (1, 0, 0),
+        'requires_cli': (2, 0, 0),
+    }]
+
+
+@pytest.mark.parametrize('decorator_args, plugin_args, expected', [
+    ('"my-cmd"', '', ("my-cmd", None)),
+    ('name="my-cmd", short_help="deco"', '', ("my-cmd", "deco")),
+    ('"my-cmd", short_help="deco"', 'short_help="plugin",', ("my-cmd",
+                                                             "plugin")),
+    ('"my-cmd"', 'short_help=None,', ("my-cmd", None)),
+])
+def test_name_and_short_help(decorator_args, plugin_args, expected):
+    plugin = DEFAULT_PLUGIN.replace('section="Simulation",',
+                                    'section="Simulation", ' + plugin_args)
+    source = make_source(decorator_args, plugin)
+    entry, = static_index_entries(source, location="loc")
+    assert (entry['name'], entry['short_help']) == expected
+    assert entry['requires_cli'] == (2, 0)
+
+
+def test_positional_args():
+    plugin = ('PLUGIN = CommandPlugin(my_command, "Simulation", "help", '
+              'requires_lib=None, requires_cli=None)')
+    entry, = static_index_entries(make_source(plugin=plugin),
+                                  location="loc")
+    assert entry['section'] == "Simulation"
+    assert entry['short_help'] == "help"
+    assert entry['requires_lib'] is None
+
+
+def test_attribute_plugin_class():
+    plugin = DEFAULT_PLUGIN.replace("CommandPlugin(",
+                                    "plugcli.plugin_management."
+                                    "CommandPlugin(")
+    entries = static_index_entries(make_source(plugin=plugin),
+                                   location="loc")
+    assert entries[0]['name'] == "my-cmd"
+
+
+def test_custom_plugin_class():
+    plugin = DEFAULT_PLUGIN.replace("CommandPlugin(", "MyPlugin(")
+    source = make_source(plugin=plugin)
+    assert static_index_entries(source, location="loc") is None
+    entries = static_index_entries(source, location="loc",
+                                   plugin_class_name="MyPlugin")
+    assert entries[0]['name'] == "my-cmd"
+
+
+@pytest.mark.parametrize('decorator_args, plugin', [
+    ('', DEFAULT_PLUGIN),  # default name depends on click version
+    ('NAME', DEFAULT_PLUGIN),
+    ('"my-cmd"', DEFAULT_PLUGIN.replace('"Simulation"', 'SECTION')),
+    ('"my-cmd"', DEFAULT_PLUGIN.replace('(2, 0)', '"2.0"')),
+    ('"my-cmd"', DEFAULT_PLUGIN.replace('requires_cli=(2, 0),', '')),
+    ('"my-cmd"', DEFAULT_PLUGIN.replace('my_command', 'make_command()')),
+    ('"my-cmd"', DEFAULT_PLUGIN.replace('my_command', 'other_command')),
+    ('"my-cmd"', DEFAULT_PLUGIN.replace('(\n', '(**kwargs, \n')),
+    ('"my-cmd"', "PLUGINS = [" + DEFAULT_PLUGIN.split("=", 1)[1] + "]"),
+    ('"my-cmd"', ""),  # no plugins
+    # literals that can't be evaluated
+    ('"my-cmd"', DEFAULT_PLUGIN.replace('(2, 0)', '{[2]: 0}')),
+    ('"my-cmd"', DEFAULT_PLUGIN.replace('(2, 0)', '{{2}}')),
+])
+def test_not_static(decorator_args, plugin):
+    source = make_source(decorator_args, plugin)
+    assert static_index_entries(source, location="loc") is None
+
+
+def test_syntax_error():
+    assert static_index_entries("def foo(:", location="loc") is None
+
+
+def test_no_command_decorator():
+    source = make_source().replace("@click.command", "@click.option")
+    assert static_index_entries(source, location="loc") is None
@@ -0,0 +1,154 @@
+import pytest
+from unittest.mock import patch
+
+import json
+import pathlib
+
+import click
+from click.testing import CliRunner
+
+from plugcli import tracing
+from plugcli.tracing import *
+from plugcli.cli import CLI
+from plugcli.params import (
+    BatchStrategy, MultiStrategyGetter, Option, resolve_parameters
+)
+from plugcli.plugin_management import (
+    CommandPlugin, FilePluginLoader, NamespacePluginLoader
+)
+
+EXAMPLES = pathlib.Path(__file__).resolve().parent / "plugin_examples"
+
+
+@pytest.fixture
+def tracer():
+    tracer = enable_tracing()
+    yield tracer
+    disable_tracing()
+
+
+def _spans(tracer, name):
+    return [event for event in tracer.events if event['name'] == name]
+
+
+def _contains(outer, inner):
+    return (outer['ts'] <= inner['ts']
+            and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur'])
+
+
+class TestTracer:
+    def setup_method(self):
+        self.tracer = Tracer()
+        with self.tracer.span("outer", "test", detail=1):
+            with self.tracer.span("inner", "test"):
+                pass
+
+    def test_span(self):
+        inner, outer = self.tracer.events
+        assert outer['name'] == "outer"
+        assert outer['ph'] == "X"
+        assert outer['args'] == {'detail': 1}
+        assert 'args' not in inner
+        assert _contains(outer, inner)
+
+    def test_trace_events(self):
+        events = self.tracer.trace_events()
+        assert events[0]['ph'] == "M"
+        assert [event['name'] for event in events[1:]] == ["outer", "inner"]
+
+    def test_emit(self, tmp_path):
+        destination = tmp_path / "trace.json"
+        self.tracer.emit(str(destination))
+        trace = json.loads(destination.read_text())
+        assert len(trace['traceEvents']) == 3
+
+
+def test_loader_tracing(tracer):
+    loader = FilePluginLoader(EXAMPLES, CommandPlugin)
+    loader()
+    (call,) = _spans(tracer, "FilePluginLoader.__call__")
+    loads = _spans(tracer, "load_candidate")
+    assert {span['args']['candidate'] for span in loads} == {
+        str(EXAMPLES / (name + ".py")) for name in ['exampleA', 'exampleB']
+    }
+    assert all(_contains(call, span) for span in loads)
+    assert len(_spans(tracer, "find_candidates")) == 1
+
+
+def test_namespace_loader_tracing(tracer):
+    loader = NamespacePluginLoader("plugcli.tests.plugin_examples",
+                                   CommandPlugin)
+    loader()
+    loads = _spans(tracer, "load_candidate")
+    # one span per module, around its import
+    assert sorted(span['args']['candidate'] for span in loads) == [
+        f"plugcli.tests.plugin_examples.{name}"
+        for name in ['exampleA', 'exampleB']
+    ]
+
+
+def test_cli_tracing(tracer):
+    name_option = Option("--name", getter=lambda user_input, context:
+                         user_input.upper())
+
+    @click.command("greet")
+    @name_option.parameter()
+    def greet(name):
+        click.echo(f"hello {name_option.get(name)}")
+
+    class TracedCLI(CLI):
+        COMMAND_SECTIONS = ["Simulation"]
+        def get_installed_plugins(self):
+            return [CommandPlugin(command=greet, section="Simulation",
+                                  requires_lib=None, requires_cli=None)]
+
+    cli = TracedCLI()
+    result = CliRunner().invoke(cli, ["greet", "--name", "foo"])
+    assert result.output == "hello FOO\n"
+
+    (init,) = _spans(tracer, "CLI.__init__")
+    (register,) = _spans(tracer, "register")
+    assert register['args'] == {'command': "greet"}
+    assert _contains(init, register)
+
+    (main,) = _spans(tracer, "CLI.main")
+    (invoke,) = _spans(tracer, "invoke")
+    (get,) = _spans(tracer, "AbstractParameter.get")
+    assert get['args'] == {'param': "--name"}
+    assert _contains(main, invoke) and _contains(invoke, get)
+    assert _spans(tracer, "parse_args")
+    assert _spans(tracer, "get_command")[0]['args'] == {'command': "greet"}
+
+
+def test_parameter_tracing(tracer):
+    async def async_getter(user_input, context):
+        return user_input
+
+    sync_param = Option("--sync", getter=lambda user_input, context:
+                        user_input)
+    async_param = Option("--async", getter=async_getter)
+    batch_param = Option("--batch", getter=MultiStrategyGetter(
+        [BatchStrategy(lambda inputs, context: inputs)], "bad"
+    ))
+    resolve_parameters({'sync': (sync_param, 1), 'async': (async_param, 2)})
+    batch_param.get_many([3, 4])
+    spans = _spans(tracer, "AbstractParameter.get")
+    assert sorted(span['args']['param'] for span in spans) == [
+        "--async", "--batch", "--sync"
+    ]
+
+
+def test_no_tracing():
+    assert get_tracer() is None
+    with trace_span("foo", "test"):
+        pass
+
+
+def test_env_variable(monkeypatch):
+    monkeypatch.setenv("PLUGCLI_TRACE", "trace.json")
+    monkeypatch.setattr(tracing._TRACING, "env_checked", False)
+    with patch('atexit.register') as register:
+        tracer = get_tracer()
+    assert isinstance(tracer, Tracer)
+    register.assert_called_once_with(tracer.emit, "trace.json")
+    disable_tracing()
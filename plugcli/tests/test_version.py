@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import patch
+
+import importlib
+import os
+import subprocess
+
+from plugcli import version
+
+
+def make_info(is_repo):
+    return {'short_version': "1.0", '_git_version': "abc1234",
+            '_is_repo': is_repo, 'git_hash': "abc1234",
+            'full_version': "1.0+gabc1234", 'version': "1.0"}
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("PLUGCLI_CACHE_DIR", str(cache_dir))
+    monkeypatch.setattr(version, "_VERSION_INFO", None)
+    return cache_dir
+
+
+def test_import_does_not_run_git():
+    with patch.object(subprocess, "Popen") as popen:
+        importlib.reload(version)
+    assert not popen.called
+
+
+def test_attribute_computed_on_access(cache_dir):
+    with patch.object(version, "_compute_version_info",
+                      return_value=make_info(False)) as compute:
+        assert version.version == "1.0"
+        assert version.full_version == "1.0+gabc1234"
+    compute.assert_called_once_with()
+    with pytest.raises(AttributeError):
+        version.missing
+
+
+@pytest.mark.parametrize('is_repo', [True, False])
+def test_cache_written_for_installed_copies(cache_dir, is_repo):
+    with patch.object(version, "_compute_version_info",
+                      return_value=make_info(is_repo)):
+        version._version_info()
+    assert os.path.exists(version._version_cache_file()) != is_repo
+
+
+def test_cache_reused(cache_dir):
+    version._save_cached_version_info(make_info(False))
+    with patch.object(version, "_compute_version_info") as compute:
+        assert version._version_info() == make_info(False)
+    assert not compute.called
+
+
+def test_stamp_mismatch_invalidates_cache(cache_dir):
+    version._save_cached_version_info(make_info(False))
+    assert version._load_cached_version_info() == make_info(False)
+    with patch.object(version, "_version_cache_stamp",
+                      return_value=[None, None]):
+        assert version._load_cached_version_info() is None
+
+
+def test_unwritable_cache_dir(cache_dir):
+    cache_dir.write_text("not a directory")
+    with patch.object(version, "_compute_version_info",
+                      return_value=make_info(False)):
+        assert version._version_info() == make_info(False)
+    assert version._load_cached_version_info() is None
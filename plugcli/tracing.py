@@ -0,0 +1,145 @@
+"""Timeline tracing of a CLI invocation.
+
+Set the environment variable ``PLUGCLI_TRACE`` to a filename to record
+nested spans for the phases of a CLI invocation: creating the CLI,
+running each plugin loader, loading each plugin candidate, registering
+plugins, click's argument parsing, looking up commands, resolving
+parameters with their getters, and invoking the command. When the process
+exits, the trace is written to that file in the Chrome trace event format,
+which can be opened in Perfetto (https://ui.perfetto.dev) or
+``chrome://tracing``.
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+from ._instrumentation import EnvActivatedInstrument
+
+
+class Tracer:
+    """Record spans as Chrome trace "complete" events.
+
+    Spans from different threads are recorded on separate tracks, so
+    concurrent plugin loading shows up as parallel timelines.
+    """
+    def __init__(self):
+        self.events = []
+        self.pid = os.getpid()
+
+    @staticmethod
+    def _now():
+        # trace timestamps are in microseconds
+        return time.perf_counter_ns() / 1000
+
+    @contextlib.contextmanager
+    def span(self, name, category, **args):
+        """Context manager recording a span.
+
+        Parameters
+        ----------
+        name : str
+            name of the span, as shown in the trace viewer
+        category : str
+            category of the span (e.g., "cli" or "plugin")
+        args :
+            additional details for the span; must be JSON-serializable
+        """
+        start = self._now()
+        try:
+            yield
+        finally:
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': "X",
+                'ts': start,
+                'dur': self._now() - start,
+                'pid': self.pid,
+                'tid': threading.get_ident(),
+            }
+            if args:
+                event['args'] = args
+            self.events.append(event)
+
+    def trace_events(self):
+        """All recorded events, including process metadata.
+
+        Returns
+        -------
+        List[Dict[str, Any]] :
+            events in the Chrome trace event format, in order of start time
+        """
+        metadata = {
+            'name': "process_name",
+            'ph': "M",
+            'pid': self.pid,
+            'args': {'name': os.path.basename(sys.argv[0]) or "python"},
+        }
+        spans = sorted(self.events, key=lambda event: event['ts'])
+        return [metadata] + spans
+
+    def to_json(self):
+        """Trace as a JSON string"""
+        return json.dumps({'traceEvents': self.trace_events(),
+                           'displayTimeUnit': "ms"})
+
+    def emit(self, destination):
+        """Write the trace to a file.
+
+        Parameters
+        ----------
+        destination : str
+            filename for the trace
+        """
+        with open(destination, mode='w', encoding='utf-8') as f:
+            f.write(self.to_json())
+
+
+_TRACING = EnvActivatedInstrument("PLUGCLI_TRACE", Tracer)
+
+
+def enable_tracing(destination=None):
+    """Start tracing.
+
+    Parameters
+    ----------
+    destination : str or None
+        if given, the trace is written to this file when the process exits
+
+    Returns
+    -------
+    :class:`.Tracer` :
+        the active tracer
+    """
+    return _TRACING.enable(destination)
+
+
+def disable_tracing():
+    """Stop tracing"""
+    _TRACING.disable()
+
+
+def get_tracer():
+    """The active tracer, or None if tracing is not enabled.
+
+    The first call checks the ``PLUGCLI_TRACE`` environment variable.
+    """
+    return _TRACING.get()
+
+
+def trace_span(name, category, **args):
+    """Context manager recording a span in the active tracer, if any.
+
+    Parameters
+    ----------
+    name : str
+        name of the span
+    category : str
+        category of the span
+    args :
+        additional details for the span; must be JSON-serializable
+    """
+    return _TRACING.context("span", name, category, **args)
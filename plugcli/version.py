@@ -126,16 +126,105 @@ def get_setup_version(default_version, directory, filename="setup.cfg"):
     return version
 
 
-short_version = get_setup_version(_installed_version,
-                                  directory=_version_setup_depth)
-_git_version = get_git_version()
-_is_repo = (_git_version != '' and _git_version != "Unknown")
-
-if _is_repo:
-    git_hash = _git_version
-    full_version = short_version + "+g" + _git_version[:7]
-    version = full_version
-else:
-    git_hash = "Unknown"
-    full_version = short_version + "+g" + _installed_git_hash[:7] + '.install'
-    version = short_version
+def _compute_version_info():
+    short_version = get_setup_version(_installed_version,
+                                      directory=_version_setup_depth)
+    _git_version = get_git_version()
+    _is_repo = (_git_version != '' and _git_version != "Unknown")
+
+    if _is_repo:
+        git_hash = _git_version
+        full_version = short_version + "+g" + _git_version[:7]
+        version = full_version
+    else:
+        git_hash = "Unknown"
+        full_version = (short_version + "+g" + _installed_git_hash[:7]
+                        + '.install')
+        version = short_version
+
+    return {
+        'short_version': short_version,
+        '_git_version': _git_version,
+        '_is_repo': _is_repo,
+        'git_hash': git_hash,
+        'full_version': full_version,
+        'version': version,
+    }
+
+
+# Version info is computed on first access (see module __getattr__) rather
+# than on import, because computing it runs a git subprocess and may search
+# parent directories for setup.cfg. For installed (non-repository) copies,
+# the result is also saved to disk, keyed on the install location.
+
+_VERSION_INFO = None
+
+
+def _version_cache_stamp():
+    # changes to these files (e.g., reinstalling) invalidate the cache
+    my_dir = os.path.dirname(os.path.abspath(__file__))
+    stamp = []
+    for filename in ["version.py", "_installed_version.py"]:
+        try:
+            stat = os.stat(os.path.join(my_dir, filename))
+        except OSError:
+            stamp.append(None)
+        else:
+            stamp.append([stat.st_mtime_ns, stat.st_size])
+    return stamp
+
+
+def _version_cache_file():
+    import hashlib
+    from .discovery_cache import user_cache_dir
+    my_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256(my_dir.encode('utf-8')).hexdigest()
+    return os.path.join(user_cache_dir(), "version-" + digest[:16] + ".json")
+
+
+def _load_cached_version_info():
+    import json
+    try:
+        with open(_version_cache_file()) as f:
+            cached = json.load(f)
+    except (OSError, ValueError, ImportError):
+        return None
+
+    if cached.get('stamp') != _version_cache_stamp():
+        return None
+    return cached.get('info')
+
+
+def _save_cached_version_info(info):
+    import json
+    try:
+        cache_file = _version_cache_file()
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp = cache_file + "." + str(os.getpid()) + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'stamp': _version_cache_stamp(), 'info': info}, f)
+        os.replace(tmp, cache_file)
+    except (OSError, ImportError):
+        pass  # can't write the cache; just recompute next time
+
+
+def _version_info():
+    global _VERSION_INFO
+    if _VERSION_INFO is None:
+        info = _load_cached_version_info()
+        if info is None:
+            info = _compute_version_info()
+            # git hash of a repository changes with each commit, so only
+            # installed copies are safe to save
+            if not info['_is_repo']:
+                _save_cached_version_info(info)
+        _VERSION_INFO = info
+    return _VERSION_INFO
+
+
+def __getattr__(name):
+    # lazy module attributes (PEP 562)
+    if name in ['short_version', '_git_version', '_is_repo', 'git_hash',
+                'full_version', 'version']:
+        return _version_info()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")